@@ -23,6 +23,9 @@ import time
 import platform
 import textwrap
 import shutil
+import errno
+import heapq
+import selectors
 from pathlib import Path
 from datetime import datetime, timedelta
 
@@ -244,6 +247,141 @@ def fallback_file_explorer():
             print("Pilihan tidak valid.")
 
 # ---------------- PERBAIKAN FUNGSI PORT SCANNER FALLBACK ----------------
+class TokenBucket:
+    """Pembatas laju probe sederhana: `rate` token/detik, burst kecil agar probe terdistribusi rata"""
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.burst = float(burst) if burst else max(1.0, self.rate / 20)
+        self.tokens = self.burst
+        self.stamp = time.monotonic()
+
+    def wait(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+        self.tokens -= 1
+        if self.tokens < 0:
+            time.sleep(-self.tokens / self.rate)
+
+# Connect non-blocking yang "sedang berjalan" (Linux/BSD/Windows)
+_CONNECT_PENDING = {errno.EINPROGRESS, errno.EWOULDBLOCK, errno.EAGAIN, errno.EALREADY, 10035}
+FALLBACK_SCAN_TIMEOUT = float(os.environ.get("ERALDFORGE_SCAN_TIMEOUT", "0.35"))
+FALLBACK_SCAN_BATCH = int(os.environ.get("ERALDFORGE_SCAN_CONCURRENCY", "512"))
+RESOLVE_TTL = float(os.environ.get("ERALDFORGE_RESOLVE_TTL", "300"))
+_resolve_cache = {}  # host -> (kedaluwarsa, [alamat])
+
+def resolve_host(host):
+    """getaddrinfo dual-stack (IPv4 + IPv6) dengan cache TTL.
+    Return list alamat urut preferensi sistem; kosong jika gagal resolve."""
+    host = host.strip("[]")
+    now = time.monotonic()
+    hit = _resolve_cache.get(host)
+    if hit and hit[0] > now:
+        return hit[1]
+    try:
+        infos = socket.getaddrinfo(host, None, socket.AF_UNSPEC, socket.SOCK_STREAM, 0, socket.AI_ADDRCONFIG)
+        addrs = list(dict.fromkeys(info[4][0] for info in infos))
+    except (socket.gaierror, UnicodeError, OSError):
+        addrs = []
+    _resolve_cache[host] = (now + (RESOLVE_TTL if addrs else min(RESOLVE_TTL, 30.0)), addrs)
+    return addrs
+
+def fd_budget(requested, reserve=64):
+    """Batasi jumlah socket paralel sesuai limit file descriptor proses"""
+    try:
+        import resource
+        soft, _ = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if soft != resource.RLIM_INFINITY:
+            return max(1, min(requested, soft - reserve))
+    except Exception:
+        pass
+    return max(1, requested)
+
+def fallback_connect_scan(ip_addr, ports, timeout=0.35, batch=512, bucket=None, on_progress=None, on_open=None):
+    """TCP connect scan non-blocking: banyak socket sekaligus dipantau dengan selectors
+    (epoll/kqueue/poll). Timeout tiap port disesuaikan dari RTT yang teramati
+    (SRTT + 4*RTTVAR, maksimal `timeout`). Return list port open (urut)."""
+    family = socket.AF_INET6 if ":" in ip_addr else socket.AF_INET
+    sel = selectors.DefaultSelector()
+    pending = iter(ports)
+    inflight = {}      # socket -> (port, waktu mulai)
+    deadlines = []     # heap (deadline, urutan, socket)
+    seq = 0
+    open_ports = []
+    checked = 0
+    srtt = rttvar = None
+
+    def done(port, is_open):
+        nonlocal checked
+        checked += 1
+        if is_open:
+            open_ports.append(port)
+            if on_open:
+                on_open(port)
+
+    def finish(sock, is_open):
+        port, _started = inflight.pop(sock)
+        sel.unregister(sock)
+        sock.close()
+        done(port, is_open)
+
+    def sample(rtt):
+        nonlocal srtt, rttvar
+        if srtt is None:
+            srtt, rttvar = rtt, rtt / 2
+        else:
+            rttvar = 0.75 * rttvar + 0.25 * abs(srtt - rtt)
+            srtt = 0.875 * srtt + 0.125 * rtt
+
+    try:
+        while True:
+            # Isi slot sampai `batch` socket sedang connect
+            while len(inflight) < batch:
+                port = next(pending, None)
+                if port is None:
+                    break
+                if bucket:
+                    bucket.wait()
+                sock = socket.socket(family, socket.SOCK_STREAM)
+                sock.setblocking(False)
+                err = sock.connect_ex((ip_addr, port))
+                now = time.monotonic()
+                if err in _CONNECT_PENDING:
+                    probe_timeout = timeout if srtt is None else min(timeout, max(0.05, srtt + 4 * rttvar))
+                    inflight[sock] = (port, now)
+                    sel.register(sock, selectors.EVENT_WRITE)
+                    seq += 1
+                    heapq.heappush(deadlines, (now + probe_timeout, seq, sock))
+                else:
+                    # Selesai seketika (loopback): 0 = open, selain itu ditolak/unreachable
+                    sock.close()
+                    done(port, err == 0)
+            if not inflight:
+                break
+
+            wait = max(0.0, deadlines[0][0] - time.monotonic()) if deadlines else timeout
+            for key, _mask in sel.select(wait):
+                sock = key.fileobj
+                err = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+                if err in (0, errno.ECONNREFUSED):
+                    sample(time.monotonic() - inflight[sock][1])
+                finish(sock, err == 0)
+
+            # Socket yang melewati deadline dianggap filtered/timeout
+            now = time.monotonic()
+            while deadlines and (deadlines[0][0] <= now or deadlines[0][2] not in inflight):
+                _deadline, _fd, sock = heapq.heappop(deadlines)
+                if sock in inflight:
+                    finish(sock, False)
+            if on_progress:
+                on_progress(checked)
+    finally:
+        for sock in list(inflight):
+            sel.unregister(sock)
+            sock.close()
+        sel.close()
+    return sorted(open_ports)
+
 def fallback_portscanner():
     """
     Melakukan TCP Connect Scan dasar menggunakan socket.
@@ -261,13 +399,21 @@ def fallback_portscanner():
     # Menggunakan clean_input
     rng = clean_input("Range (e.g. 20-1024) [1-1024]: ").strip() or "1-1024"
 
-    # Resolusi host
+    # Rate limit opsional (probe/detik) agar tidak memicu IDS / drop SYN backlog
+    default_rate = os.environ.get("ERALDFORGE_SCAN_RATE", "0")
     try:
-        ip_addr = socket.gethostbyname(tgt)
-        print(f"Target IP: {ip_addr}")
-    except socket.gaierror:
+        rate = float(clean_input(f"Rate probe/detik, 0 = tanpa batas [{default_rate}]: ").strip() or default_rate)
+    except ValueError:
+        rate = 0.0
+    bucket = TokenBucket(rate) if rate > 0 else None
+
+    # Resolusi host (IPv4 atau IPv6)
+    addrs = resolve_host(tgt)
+    if not addrs:
         print(f"Error: Host '{tgt}' tidak dapat di-resolve.")
         pause(); return
+    ip_addr = addrs[0]
+    print(f"Target IP: {ip_addr}" + (f" (juga: {', '.join(addrs[1:3])})" if len(addrs) > 1 else ""))
 
     # Parsing range port
     try:
@@ -278,34 +424,33 @@ def fallback_portscanner():
         print("Error: Range port tidak valid. Gunakan format 'min-max' (1-65535).")
         pause(); return
 
-    print(f"Scanning {ip_addr} ports {a}-{b} ... (Timeout: 0.35s per port)")
-    open_ports = []
+    batch = fd_budget(FALLBACK_SCAN_BATCH)
+    print(f"Scanning {ip_addr} ports {a}-{b} ... (Timeout: {FALLBACK_SCAN_TIMEOUT}s per port, {batch} socket paralel)")
     total_ports = b - a + 1
+    last = [-1]
 
-    # Loop pemindaian port
-    for i, p in enumerate(range(a, b + 1)):
-        try:
-            # Tampilkan progress setiap 100 port atau 1%
-            if i % 100 == 0 or (total_ports > 100 and (i * 100) // total_ports != ((i-1) * 100) // total_ports):
-                progress = (i * 100) // total_ports
-                sys.stdout.write(f"\rProgress: {progress}% ({i}/{total_ports} ports checked)... ")
-                sys.stdout.flush()
-
-            s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            s.settimeout(0.35)
-            # connect_ex mengembalikan 0 jika koneksi berhasil
-            if s.connect_ex((ip_addr, p)) == 0:
-                open_ports.append(p)
-                # Tampilkan port yang ditemukan di baris baru
-                sys.stdout.write(f"\r{C['accent']}Port {p} terbuka!{C['reset']}")
-                sys.stdout.write("\n") # Lanjut ke baris baru setelah menemukan port
-            s.close()
-        except KeyboardInterrupt:
-            print("\rDibatalkan oleh pengguna.")
-            break
-        except Exception:
-            # Abaikan error koneksi atau timeout lainnya
-            pass
+    def on_progress(i):
+        # Tampilkan progress setiap 100 port atau 1%
+        progress = (i * 100) // total_ports
+        if i - last[0] >= 100 or progress != (last[0] * 100) // total_ports:
+            last[0] = i
+            sys.stdout.write(f"\rProgress: {progress}% ({i}/{total_ports} ports checked)... ")
+            sys.stdout.flush()
+
+    open_ports = []
+
+    def on_open(p):
+        open_ports.append(p)
+        # Tampilkan port yang ditemukan di baris baru
+        sys.stdout.write(f"\r{C['accent']}Port {p} terbuka!{C['reset']}")
+        sys.stdout.write("\n") # Lanjut ke baris baru setelah menemukan port
+
+    try:
+        fallback_connect_scan(ip_addr, range(a, b + 1), FALLBACK_SCAN_TIMEOUT, batch,
+                              bucket, on_progress, on_open)
+    except KeyboardInterrupt:
+        print("\rDibatalkan oleh pengguna.")
+    open_ports.sort()
 
     # Cetak hasil
     # Bersihkan progress bar sebelum mencetak hasil akhir
@@ -2,16 +2,51 @@
 # EraldForge - Calculator (Erald Ultimate Edition)
 # Versi: Modern, Canggih, Profesional, Aman, Statistik
 
-import os, ast, math, readline, sys
+import os, ast, math, operator, readline, sys, re, keyword, pickle
 from fractions import Fraction
+from decimal import Decimal, localcontext
+import decimal
+from functools import lru_cache
 from datetime import datetime
-from collections import Counter
-import textwrap
+from collections import deque
+from array import array
+from itertools import groupby
+from itertools import islice
+
+# NumPy opsional: backend statistik vektor; tanpa NumPy dipakai modul array
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 # --- Konfigurasi Dasar ---
 HOME = os.path.expanduser("~")
 HIST_FILE = os.path.join(HOME, ".eraldforge_calc_history")
+# Jumlah entri riwayat di memori (ring) dan di readline; file dipadatkan bila barisnya melebihi HIST_MAX * HIST_COMPACT_FACTOR
+HIST_MAX = int(os.environ.get("ERALDFORGE_CALC_HISTORY", "200"))
+HIST_COMPACT_FACTOR = 4
 WAKTU_SEKARANG = datetime.now()
+# Jumlah ekspresi terkompilasi yang disimpan di cache LRU (0 = tanpa cache, evaluasi langsung)
+CALC_CACHE_SIZE = int(os.environ.get("ERALDFORGE_CALC_CACHE", "256"))
+# Batas ukuran hasil bilangan bulat (bit) untuk **, << dan pangkat(); mencegah 2 ** 10000000 membekukan REPL
+CALC_MAX_BITS = int(os.environ.get("ERALDFORGE_CALC_MAX_BITS", "65536"))
+# Batas panjang hasil perkalian string/list ('ab' * n)
+CALC_MAX_ITEMS = int(os.environ.get("ERALDFORGE_CALC_MAX_ITEMS", "1000000"))
+# Engine angka: float (bawaan), decimal (presisi CALC_PRECISION digit) atau fraction (rasional eksak)
+CALC_ENGINE = os.environ.get("ERALDFORGE_CALC_ENGINE", "float").lower()
+CALC_PRECISION = int(os.environ.get("ERALDFORGE_CALC_PREC", "50"))
+# Batas presisi decimal; pi dan e dihitung ulang per presisi sehingga presisi sangat besar akan lambat
+CALC_MAX_PREC = int(os.environ.get("ERALDFORGE_CALC_MAX_PREC", "10000"))
+# Variabel & fungsi pengguna: file simpanan namespace dan ukuran memo LRU per fungsi murni
+CALC_NS_FILE = os.environ.get("ERALDFORGE_CALC_VARS", os.path.join(HOME, ".eraldforge_calc_vars.json"))
+CALC_MEMO_SIZE = int(os.environ.get("ERALDFORGE_CALC_MEMO", "1024"))
+# Mode batch: jumlah proses evaluasi (1 = satu proses) dan ukuran potongan baris per tugas
+CALC_JOBS = int(os.environ.get("ERALDFORGE_CALC_JOBS", "1"))
+BATCH_CHUNK = int(os.environ.get("ERALDFORGE_CALC_BATCH_CHUNK", "512"))
+BATCH_FORMATS = ("text", "json", "jsonl")
+# Python 3.11+ membatasi konversi int -> str (4300 digit); samakan dengan CALC_MAX_BITS agar hasil yang lolos bisa ditampilkan
+if hasattr(sys, "set_int_max_str_digits") and 0 < sys.get_int_max_str_digits() < CALC_MAX_BITS * 0.30103 + 2:
+    sys.set_int_max_str_digits(int(CALC_MAX_BITS * 0.30103) + 2)
 
 # --- Definisi Warna (Skema Neon High-Tech) ---
 R = "\033[91m"     # Merah Terang (Error)
@@ -41,36 +76,137 @@ def print_banner():
 
 # --- FITUR BARU: Statistik Dasar (Mean, Median, Modus) ---
 def hitung_statistik(data_list):
-    if not all(isinstance(x, (int, float)) for x in data_list):
+    # Decimal/Fraction dari engine presisi ikut diterima (diringkas sebagai float)
+    if not all(isinstance(x, (int, float, Decimal, Fraction)) for x in data_list):
         raise ValueError("Semua elemen list harus berupa angka (int/float).")
     
     n = len(data_list)
     if n == 0:
         raise ValueError("List data tidak boleh kosong.")
     
-    # Mean (Rata-rata)
-    mean = sum(data_list) / n
-    
-    # Median
-    data_list_sorted = sorted(data_list)
-    if n % 2 == 1:
-        median = data_list_sorted[n // 2]
+    return format_statistik(hitung_statistik_vektor(array('d', data_list)))
+
+# --- Statistik Vektor (NumPy jika ada, fallback modul array) ---
+STAT_PERCENTILES = (1, 5, 25, 50, 75, 95, 99)
+STAT_BINS = 10
+STAT_MAX_MODES = 5
+_STAT_SEPARATORS = str.maketrans({",": " ", ";": " ", "\t": " "})
+
+def baca_data(sumber, kolom=None):
+    """Baca angka dari file (CSV / satu angka per baris) atau '-' untuk stdin.
+    kolom = indeks kolom CSV (mulai 0); tanpa kolom semua angka diambil.
+    Token non-angka (header, teks) dilewati. Return (array('d'), jumlah token dilewati)"""
+    if sumber == "-":
+        text = sys.stdin.read()
     else:
-        median = (data_list_sorted[n // 2 - 1] + data_list_sorted[n // 2]) / 2
-        
-    # Modus
-    counts = Counter(data_list)
-    max_count = max(counts.values())
-    modus = [key for key, value in counts.items() if value == max_count]
-    
-    # Format output custom untuk statistik
+        with open(os.path.expanduser(sumber), encoding="utf-8", errors="replace") as f:
+            text = f.read()
+
+    def tokens():
+        if kolom is not None:
+            import csv
+            return (row[kolom] for row in csv.reader(text.splitlines()) if len(row) > kolom)
+        return text.translate(_STAT_SEPARATORS).split()
+
+    values, skipped = array('d'), 0
+    try:
+        values.extend(map(float, tokens()))  # jalur cepat: semua token angka
+    except ValueError:
+        values = array('d')
+        for t in tokens():
+            try: values.append(float(t))
+            except ValueError: skipped += 1
+    # NaN/inf tidak bermakna untuk ringkasan statistik
+    if not all(map(math.isfinite, values)):
+        finite = array('d', filter(math.isfinite, values))
+        skipped += len(values) - len(finite)
+        values = finite
+    return values, skipped
+
+def _persentil(data_sorted, q):
+    """Persentil interpolasi linear (sama dengan default NumPy) dari data terurut"""
+    pos = (len(data_sorted) - 1) * q / 100
+    lo = int(pos)
+    hi = min(lo + 1, len(data_sorted) - 1)
+    return data_sorted[lo] + (data_sorted[hi] - data_sorted[lo]) * (pos - lo)
+
+def hitung_statistik_vektor(data, bins=STAT_BINS, percentiles=STAT_PERCENTILES):
+    """Ringkasan statistik untuk array('d'): n, min, max, mean, median, modus, varians (sampel),
+    simpangan baku, persentil dan histogram. NumPy dipakai bila terpasang."""
+    n = len(data)
+    if n == 0:
+        raise ValueError("Data kosong (tidak ada angka yang terbaca).")
+    if np is not None:
+        arr = np.frombuffer(data, dtype=np.float64)
+        values, counts = np.unique(arr, return_counts=True)   # satu sort: modus
+        top = counts.max()
+        modes = values[counts == top][:STAT_MAX_MODES].tolist() if top > 1 else []
+        pcts = np.percentile(arr, percentiles).tolist()
+        hist, edges = np.histogram(arr, bins=bins)
+        mean = float(arr.mean())
+        var = float(arr.var(ddof=1)) if n > 1 else 0.0
+        lo, hi = float(values[0]), float(values[-1])
+        hist, edges = hist.tolist(), edges.tolist()
+    else:
+        data_sorted = sorted(data)
+        lo, hi = data_sorted[0], data_sorted[-1]
+        mean = math.fsum(data_sorted) / n
+        var = math.fsum((x - mean) ** 2 for x in data_sorted) / (n - 1) if n > 1 else 0.0
+        pcts = [_persentil(data_sorted, q) for q in percentiles]
+        # Modus dari run nilai sama pada data terurut
+        top, modes = 1, []
+        for value, run in groupby(data_sorted):
+            c = sum(1 for _ in run)
+            if c > top: top, modes = c, [value]
+            elif c == top and top > 1 and len(modes) < STAT_MAX_MODES: modes.append(value)
+        # Seperti numpy.histogram: data konstan (min == max) memakai rentang [min - 0.5, max + 0.5]
+        h_lo, h_hi = (lo - 0.5, hi + 0.5) if lo == hi else (lo, hi)
+        width = (h_hi - h_lo) / bins
+        hist = [0] * bins
+        for x in data_sorted:
+            hist[min(int((x - h_lo) / width), bins - 1)] += 1
+        edges = [h_lo + width * i for i in range(bins)] + [h_hi]
+    return {
+        "n": n, "min": lo, "max": hi, "mean": mean, "median": pcts[list(percentiles).index(50)] if 50 in percentiles else None,
+        "modus": modes, "modus_count": int(top), "varians": var, "stdev": math.sqrt(var),
+        "persentil": dict(zip(percentiles, pcts)), "histogram": list(zip(edges[:-1], edges[1:], hist)),
+        "backend": "numpy" if np is not None else "array",
+    }
+
+def _angka(x):
+    """Tampilkan float bulat tanpa .0 dan sisanya dengan 6 angka penting"""
+    return str(int(x)) if float(x).is_integer() and abs(x) < 1e15 else f"{x:.6g}"
+
+def format_statistik(st, lebar_bar=30):
     output = f"\n{C_NEON} STATISTIK HASIL:{W}\n"
-    output += f"   {BOLD}Mean (Rata-rata):{W} {mean}\n"
-    output += f"   {BOLD}Median:{W} {median}\n"
-    output += f"   {BOLD}Modus:{W} {', '.join(map(str, modus))}"
-    
+    output += f"   {BOLD}Jumlah data:{W} {st['n']}   {BOLD}Min:{W} {_angka(st['min'])}   {BOLD}Max:{W} {_angka(st['max'])}\n"
+    output += f"   {BOLD}Mean (Rata-rata):{W} {st['mean']:.6g}\n"
+    output += f"   {BOLD}Median:{W} {_angka(st['median'])}\n"
+    modus = ", ".join(map(_angka, st["modus"])) + f" ({st['modus_count']}x)" if st["modus"] else "- (semua nilai unik)"
+    output += f"   {BOLD}Modus:{W} {modus}\n"
+    output += f"   {BOLD}Varians (sampel):{W} {st['varians']:.6g}   {BOLD}Simpangan baku:{W} {st['stdev']:.6g}\n"
+    output += f"   {BOLD}Persentil:{W} " + "  ".join(f"p{q}={_angka(v)}" for q, v in st["persentil"].items()) + "\n"
+    output += f"   {BOLD}Histogram:{W}"
+    peak = max(c for _, _, c in st["histogram"]) or 1
+    for a, b, c in st["histogram"]:
+        bar = "█" * max(1 if c else 0, round(c / peak * lebar_bar))
+        output += f"\n   {_angka(a):>10} – {_angka(b):<10} {C_BOX}{bar}{W} {c}"
     return output
 
+def statfile_cmd(parts):
+    """Perintah REPL: statfile <path> [kolom]"""
+    if len(parts) not in (2, 3):
+        print(R + "Penggunaan: statfile <file.csv|file.txt> [kolom]" + W)
+        return
+    try:
+        kolom = int(parts[2]) if len(parts) == 3 else None
+        data, skipped = baca_data(parts[1], kolom)
+        print(format_statistik(hitung_statistik_vektor(data)))
+        if skipped:
+            print(C_BOX + f"   ({skipped} token non-angka dilewati)" + W)
+    except (OSError, ValueError) as e:
+        print(R + f"Error statistik: {e}" + W)
+
 # --- Fungsi Geometri (Luas) ---
 def hitung_luas(jenis, *args):
     """Menghitung luas berbagai bangun datar."""
@@ -90,11 +226,126 @@ def hitung_luas(jenis, *args):
     else:
         raise ValueError(f"Bangun datar '{jenis}' tidak didukung. Coba: persegi, segitiga, lingkaran, persegipanjang.")
 
+# --- Operator dengan Batas Ukuran Hasil ---
+def _int_bits(x):
+    """Perkiraan ukuran (bit) bilangan bulat/pecahan; None untuk tipe lain (float dll)"""
+    if isinstance(x, bool): return 1
+    if isinstance(x, int): return abs(x).bit_length()
+    if isinstance(x, Fraction): return max(abs(x.numerator).bit_length(), x.denominator.bit_length())
+    return None
+
+# Engine aktif; diubah lewat set_engine() (bukan langsung) karena cache kompilasi ikut di-reset
+_engine = "float"
+
+def _log2_abs(x):
+    if isinstance(x, Fraction):
+        return max(_log2_abs(x.numerator), _log2_abs(x.denominator))
+    return math.log2(abs(x))
+
+def _estimasi_bit(op, l, r):
+    """Model biaya: perkiraan ukuran hasil (bit) operasi int/Fraction sebelum dihitung.
+    None = hasil bukan bilangan eksak (float/Decimal) sehingga biayanya kecil dan tetap."""
+    bl = _int_bits(l)
+    if bl is None: return None
+    if op is ast.Pow:
+        if not isinstance(r, int) or isinstance(r, bool) or bl <= 1: return None
+        # int ** negatif di engine float menghasilkan float (murah)
+        if r < 0 and not isinstance(l, Fraction) and _engine != "fraction": return None
+        # Batas atas (gagal-aman): bit(l**r) = floor(|r| * log2|l|) + 1; margin kecil menutup galat pembulatan float
+        return int(abs(r) * _log2_abs(l) * (1 + 1e-9)) + 1
+    if op is ast.LShift:
+        return bl + r if isinstance(r, int) and r > 0 and l else None
+    br = _int_bits(r)
+    return bl + br if br is not None else None  # Mult/Div: ukuran pembilang/penyebut dijumlahkan
+
+def _over_budget(what, fallback):
+    """Hasil eksak melebihi CALC_MAX_BITS: engine decimal menghitung pendekatan presisi tetap, engine lain menolak"""
+    if _engine == "decimal":
+        return fallback()
+    raise ValueError(f"Hasil {what} terlalu besar (> {CALC_MAX_BITS} bit)")
+
+def _dec(x):
+    """Konversi ke Decimal tanpa derau biner float (0.1 -> Decimal('0.1'))"""
+    if isinstance(x, Decimal): return x
+    if isinstance(x, float): return Decimal(repr(x))
+    if isinstance(x, Fraction): return Decimal(x.numerator) / x.denominator
+    return Decimal(x)
+
+def _safe_pow(l, r, mod=None):
+    """l ** r (atau pow modular) dengan cek ukuran sebelum dihitung"""
+    # Pangkat Fraction bulat (mis. 400000/2 di engine fraction) dihitung eksak oleh Python: jadikan int agar ikut dicek
+    if isinstance(r, Fraction) and r.denominator == 1:
+        r = r.numerator
+    if mod is not None:
+        return pow(l, r, mod)  # pow modular: hasil selalu < mod, murah
+    bits = _estimasi_bit(ast.Pow, l, r)
+    if bits is not None and bits > CALC_MAX_BITS:
+        return _over_budget("pangkat", lambda: _dec(l) ** r)
+    if _engine != "float" and isinstance(l, int) and isinstance(r, int) and r < 0 and l:
+        return (Fraction(l) if _engine == "fraction" else _dec(l)) ** r  # 2 ** -3 tetap eksak
+    return l ** r
+
+def _safe_lshift(l, r):
+    bits = _estimasi_bit(ast.LShift, l, r)
+    if bits is not None and bits > CALC_MAX_BITS:
+        return _over_budget("geser kiri", lambda: _dec(l) * Decimal(2) ** r)
+    return l << r
+
+def _safe_mul(l, r):
+    # Perkalian string/list dengan bilangan = pengulangan; batasi panjang hasil
+    if isinstance(l, (str, list)) and isinstance(r, int) and len(l) * r > CALC_MAX_ITEMS or \
+       isinstance(r, (str, list)) and isinstance(l, int) and len(r) * l > CALC_MAX_ITEMS:
+        raise ValueError(f"Hasil perkalian terlalu panjang (> {CALC_MAX_ITEMS} elemen)")
+    bits = _estimasi_bit(ast.Mult, l, r)
+    if bits is not None and bits > CALC_MAX_BITS:
+        return _over_budget("perkalian", lambda: _dec(l) * _dec(r))
+    return l * r
+
+def _safe_div(l, r):
+    bits = _estimasi_bit(ast.Div, l, r) if isinstance(l, Fraction) or isinstance(r, Fraction) else None
+    if bits is not None and bits > CALC_MAX_BITS:
+        return _over_budget("pembagian", lambda: _dec(l) / _dec(r))
+    return l / r
+
+# Tabel operator biner, dibuat sekali: hanya operator yang dipakai node yang dihitung
+BINOP_FUNCS = {
+    ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: _safe_mul, ast.Div: _safe_div,
+    ast.FloorDiv: operator.floordiv, ast.Mod: operator.mod, ast.Pow: _safe_pow,
+    ast.BitXor: operator.xor, ast.BitAnd: operator.and_, ast.BitOr: operator.or_,
+    ast.LShift: _safe_lshift, ast.RShift: operator.rshift,
+}
+
+def _dec_binop(fn):
+    """Decimal tidak bisa dicampur float/Fraction: samakan dulu (hasil fungsi float seperti sin() ikut jadi Decimal)"""
+    def op(l, r):
+        if isinstance(l, Decimal) or isinstance(r, Decimal):
+            if isinstance(l, (float, Fraction)): l = _dec(l)
+            if isinstance(r, (float, Fraction)): r = _dec(r)
+        return fn(l, r)
+    return op
+
+def _dec_div(l, r):
+    if not r: raise ZeroDivisionError("division by zero")  # Decimal melempar InvalidOperation/DivisionByZero
+    if isinstance(l, int) and isinstance(r, int): return _dec(l) / _dec(r)
+    return _safe_div(l, r)
+
+def _frac_div(l, r):
+    if isinstance(l, int) and isinstance(r, int):
+        if not r: raise ZeroDivisionError("division by zero")
+        l = Fraction(l)  # 1/3 tetap eksak
+    return _safe_div(l, r)
+
+ENGINE_BINOPS = {
+    "float": BINOP_FUNCS,
+    "decimal": {op: _dec_binop(fn) for op, fn in {**BINOP_FUNCS, ast.Div: _dec_div}.items()},
+    "fraction": {**BINOP_FUNCS, ast.Div: _frac_div},
+}
+
 # --- Lingkungan Matematika Aman (Safe Math Environment) ---
 SAFE_FUNCS = {
     'akar': math.sqrt, 'sin': math.sin, 'cos': math.cos, 'tan': math.tan,
     'log': math.log, 'log10': math.log10, 'exp': math.exp,
-    'pangkat': pow, 'abs': abs, 'bulatkan': round, 
+    'pangkat': _safe_pow, 'abs': abs, 'bulatkan': round, 
     'bulatkan_bawah': math.floor, 'bulatkan_atas': math.ceil,
     'pi': math.pi, 'e': math.e, 'Pecahan': Fraction,
     'umur': lambda y: WAKTU_SEKARANG.year - y,
@@ -108,6 +359,106 @@ ALLOWED_NODES = (ast.Expression, ast.BinOp, ast.UnaryOp, ast.Num, ast.Constant,
                  ast.USub, ast.UAdd, ast.Call, ast.Load, ast.Name, ast.Tuple, ast.List,
                  ast.BitXor, ast.BitAnd, ast.BitOr, ast.LShift, ast.RShift)
 
+# --- Engine Angka (float / decimal / fraction) ---
+CALC_ENGINES = ("float", "decimal", "fraction")
+_ENGINE_ALIASES = {"desimal": "decimal", "pecahan": "fraction", "rasional": "fraction", "exact": "fraction"}
+_engine_funcs = {}  # fungsi/konstanta pengganti SAFE_FUNCS untuk engine aktif
+# Namespace sesi: x = ... dan f(a) = ...; _scope berisi argumen fungsi pengguna yang sedang dievaluasi
+USER_VARS = {}
+USER_FUNCS = {}
+_scope = []
+
+def _decimal_pi():
+    # Resep dokumentasi modul decimal; presisi konteks aktif
+    with localcontext() as ctx:
+        ctx.prec += 2
+        three = Decimal(3)
+        lasts, t, s, n, na, d, da = 0, three, 3, 1, 0, 0, 24
+        while s != lasts:
+            lasts = s
+            n, na = n + na, na + 8
+            d, da = d + da, da + 32
+            t = (t * n) / d
+            s += t
+    return +s
+
+def _decimal_e():
+    with localcontext() as ctx:
+        ctx.prec += 2
+        s, term, k = Decimal(1), Decimal(1), 1
+        while True:
+            term /= k
+            if s + term == s: break
+            s += term; k += 1
+    return +s
+
+def _dec_domain(fn, ok):
+    def f(x):
+        x = _dec(x)
+        if not ok(x): raise ValueError("math domain error")
+        return fn(x)
+    return f
+
+def _dec_log(x, base=None):
+    x = _dec(x)
+    if x <= 0: raise ValueError("math domain error")
+    if base is None: return x.ln()
+    if base == 10: return x.log10()  # log(100, 10) = 2 tepat, bukan 2.000...0
+    return x.ln() / _dec_domain(Decimal.ln, lambda b: b > 0 and b != 1)(base)
+
+def _frac_akar(x):
+    """Akar eksak bila pembilang & penyebut kuadrat sempurna (akar(9/4) = 3/2), selain itu float"""
+    if isinstance(x, (int, Fraction)) and x >= 0:
+        x = Fraction(x)
+        n, d = math.isqrt(x.numerator), math.isqrt(x.denominator)
+        if n * n == x.numerator and d * d == x.denominator:
+            return Fraction(n, d)
+    return math.sqrt(x)
+
+def _engine_overrides(name):
+    if name == "decimal":
+        return {
+            'akar': _dec_domain(Decimal.sqrt, lambda x: x >= 0),
+            'exp': lambda x: _dec(x).exp(),
+            'log': _dec_log,
+            'log10': _dec_domain(Decimal.log10, lambda x: x > 0),
+            'pi': _decimal_pi(), 'e': _decimal_e(),
+            # Fungsi float murni (geometri) menerima float agar tidak mencampur Decimal dengan math.pi
+            'luas': lambda jenis, *a: hitung_luas(jenis, *(float(v) if isinstance(v, Decimal) else v for v in a)),
+        }
+    if name == "fraction":
+        return {'akar': _frac_akar}
+    return {}
+
+def set_engine(name, prec=None):
+    """Pilih engine angka aktif. Literal desimal dan tabel operator ikut engine saat kompilasi,
+    jadi cache ekspresi terkompilasi dikosongkan."""
+    global _engine, _engine_funcs
+    name = _ENGINE_ALIASES.get(name.lower(), name.lower())
+    if name not in CALC_ENGINES:
+        raise ValueError(f"Engine '{name}' tidak dikenal (pilih: {', '.join(CALC_ENGINES)})")
+    ctx = decimal.getcontext()
+    if prec is not None:
+        if not 1 <= prec <= CALC_MAX_PREC:
+            raise ValueError(f"Presisi harus 1..{CALC_MAX_PREC} digit")
+        ctx.prec = prec
+    # Eksponen Decimal praktis tak terbatas: 2 ** 10**9 di engine decimal jadi pendekatan, bukan Overflow
+    ctx.Emax, ctx.Emin = decimal.MAX_EMAX, decimal.MIN_EMIN
+    _engine = name
+    _engine_funcs = _engine_overrides(name)
+    compile_expr.cache_clear()
+    for f in USER_FUNCS.values(): f.reset()  # badan fungsi dikompilasi ulang, memo hasil engine lama dibuang
+
+def engine_info():
+    return f"{_engine} (presisi {decimal.getcontext().prec} digit)" if _engine == "decimal" else _engine
+
+def _to_engine(v):
+    """Literal float mengikuti engine: 0.1 jadi Decimal('0.1') / Fraction(1, 10) sehingga 0.1 + 0.2 eksak"""
+    if isinstance(v, float):
+        if _engine == "decimal": return _dec(v)
+        if _engine == "fraction" and math.isfinite(v): return Fraction(repr(v))
+    return v
+
 # --- Kelas SafeEval (Inti Logika) ---
 class SafeEval(ast.NodeVisitor):
     def generic_visit(self, node):
@@ -116,56 +467,344 @@ class SafeEval(ast.NodeVisitor):
         return super().generic_visit(node)
     def visit_Expression(self, node): return self.visit(node.body)
     def visit_BinOp(self, node):
-        l, r = self.visit(node.left), self.visit(node.right)
-        ops = {
-            ast.Add: l + r, ast.Sub: l - r, ast.Mult: l * r, ast.Div: l / r,
-            ast.FloorDiv: l // r, ast.Mod: l % r, ast.Pow: l ** r,
-            ast.BitXor: l ^ r, ast.BitAnd: l & r, ast.BitOr: l | r,
-            ast.LShift: l << r, ast.RShift: l >> r
-        }
-        if type(node.op) in ops: return ops[type(node.op)]
-        raise ValueError("Operator tidak didukung")
+        fn = ENGINE_BINOPS[_engine].get(type(node.op))
+        if fn is None: raise ValueError("Operator tidak didukung")
+        return fn(self.visit(node.left), self.visit(node.right))
     def visit_UnaryOp(self, node):
         v = self.visit(node.operand)
         if isinstance(node.op, ast.UAdd): return +v
         if isinstance(node.op, ast.USub): return -v
         raise ValueError("Operator Unary tidak diizinkan")
-    def visit_Num(self, node): return node.n
+    def visit_Num(self, node): return _to_engine(node.n)
     def visit_Constant(self, node):
-        if isinstance(node.value, (int, float, str)): return node.value # Mengizinkan string untuk 'luas' dan list untuk 'stat'
+        if isinstance(node.value, (int, float, str)): return _to_engine(node.value) # Mengizinkan string untuk 'luas' dan list untuk 'stat'
         raise ValueError("Hanya konstanta numerik (angka), string, atau list sederhana.")
     def visit_Call(self, node):
         if not isinstance(node.func, ast.Name): raise ValueError("Hanya pemanggilan fungsi sederhana")
         fname = node.func.id
-        if fname not in SAFE_FUNCS: raise ValueError(f"Fungsi '{fname}' tidak diizinkan")
+        func = _lookup_func(fname)
         args = [self.visit(a) for a in node.args]
-        return SAFE_FUNCS[fname](*args) if fname not in ('stat') else SAFE_FUNCS[fname](args[0]) # Penanganan khusus untuk stat
+        return func(*args) if fname not in ('stat') else func(args[0]) # Penanganan khusus untuk stat
     def visit_Name(self, node):
-        if node.id in SAFE_FUNCS: return SAFE_FUNCS[node.id]
-        raise ValueError(f"Nama/Variabel '{node.id}' tidak diizinkan")
+        return _lookup_name(node.id)
     def visit_Tuple(self, node):
         return [self.visit(e) for e in node.elts] # Mengizinkan tuple/list untuk args fungsi (misal: luas, stat)
     def visit_List(self, node):
         return [self.visit(e) for e in node.elts] # Mengizinkan list untuk args fungsi (misal: stat)
 
+# --- Kompilasi Ekspresi (AST -> Closure) dengan Cache LRU ---
+def _lookup_name(name):
+    if _scope and name in _scope[-1]: return _scope[-1][name]
+    if name in USER_VARS: return USER_VARS[name]
+    if name in _engine_funcs: return _engine_funcs[name]
+    if name in SAFE_FUNCS: return SAFE_FUNCS[name]
+    raise ValueError(f"Nama/Variabel '{name}' tidak diizinkan")
+
+def _lookup_func(name):
+    if name in _engine_funcs: return _engine_funcs[name]
+    if name in USER_FUNCS: return USER_FUNCS[name]
+    if name not in SAFE_FUNCS: raise ValueError(f"Fungsi '{name}' tidak diizinkan")
+    return SAFE_FUNCS[name]
+
+class SafeCompiler(ast.NodeVisitor):
+    """Validasi AST sekali (aturan sama dengan SafeEval) lalu ubah menjadi pohon closure.
+    Nama & fungsi dicari di SAFE_FUNCS saat evaluasi, jadi hasil kompilasi aman di-cache.
+    Literal dan operator mengikuti engine saat kompilasi; set_engine() mengosongkan cache."""
+    def generic_visit(self, node):
+        if type(node) not in ALLOWED_NODES:
+            raise ValueError(f"Ekspresi/Node '{type(node).__name__}' tidak diizinkan.")
+        return super().generic_visit(node)
+    def visit_Expression(self, node): return self.visit(node.body)
+    def visit_BinOp(self, node):
+        fn = ENGINE_BINOPS[_engine].get(type(node.op))
+        if fn is None: raise ValueError("Operator tidak didukung")
+        l, r = self.visit(node.left), self.visit(node.right)
+        return lambda: fn(l(), r())
+    def visit_UnaryOp(self, node):
+        v = self.visit(node.operand)
+        if isinstance(node.op, ast.UAdd): return lambda: +v()
+        if isinstance(node.op, ast.USub): return lambda: -v()
+        raise ValueError("Operator Unary tidak diizinkan")
+    def visit_Num(self, node):
+        v = _to_engine(node.n)
+        return lambda: v
+    def visit_Constant(self, node):
+        if not isinstance(node.value, (int, float, str)):
+            raise ValueError("Hanya konstanta numerik (angka), string, atau list sederhana.")
+        v = _to_engine(node.value)
+        return lambda: v
+    def visit_Call(self, node):
+        if not isinstance(node.func, ast.Name): raise ValueError("Hanya pemanggilan fungsi sederhana")
+        fname = node.func.id
+        args = [self.visit(a) for a in node.args]
+        if fname == 'stat':
+            return lambda: _lookup_func(fname)(args[0]())  # stat menerima satu list
+        return lambda: _lookup_func(fname)(*[a() for a in args])
+    def visit_Name(self, node):
+        name = node.id
+        return lambda: _lookup_name(name)
+    def visit_Tuple(self, node):
+        items = [self.visit(e) for e in node.elts]
+        return lambda: [f() for f in items]
+    visit_List = visit_Tuple
+
+@lru_cache(maxsize=max(CALC_CACHE_SIZE, 1))
+def compile_expr(expr):
+    """Parse + validasi + kompilasi sekali per teks ekspresi; hasil berupa fungsi tanpa argumen"""
+    return SafeCompiler().visit(ast.parse(expr, mode='eval'))
+
+try:
+    set_engine(CALC_ENGINE, min(max(CALC_PRECISION, 1), CALC_MAX_PREC))
+except ValueError:
+    set_engine("float")
+
 def safe_eval(expr):
-    node = ast.parse(expr, mode='eval')
-    return SafeEval().visit(node)
+    expr = expr.strip()
+    if CALC_CACHE_SIZE <= 0:
+        return SafeEval().visit(ast.parse(expr, mode='eval'))
+    return compile_expr(expr)()
+
+# --- Variabel & Fungsi Pengguna ---
+class UserFunc:
+    """Fungsi pengguna f(a, b) = ekspresi. Badan dikompilasi sekali per engine; bila murni
+    (hanya memakai argumen, fungsi bawaan, dan fungsi pengguna murni) hasilnya di-memo LRU."""
+    def __init__(self, name, params, body):
+        self.name, self.params, self.body = name, tuple(params), body
+        tree = ast.parse(body, mode='eval')
+        self.names = {n.id for n in ast.walk(tree) if isinstance(n, ast.Name)}
+        self._code = SafeCompiler().visit(tree)  # validasi saat definisi, bukan saat dipanggil
+        self.pure = False
+        self._memo = None
+
+    def reset(self):
+        self._code = None
+        self._memo = lru_cache(maxsize=CALC_MEMO_SIZE, typed=True)(self._eval) if self.pure and CALC_MEMO_SIZE > 0 else None
+
+    def _eval(self, *args):
+        if self._code is None:
+            self._code = SafeCompiler().visit(ast.parse(self.body, mode='eval'))
+        _scope.append(dict(zip(self.params, args)))
+        try:
+            return self._code()
+        finally:
+            _scope.pop()
+
+    def __call__(self, *args):
+        if len(args) != len(self.params):
+            raise ValueError(f"{self.name}() butuh {len(self.params)} argumen, diberi {len(args)}")
+        if self._memo is not None:
+            try:
+                hash(args)
+            except TypeError:
+                return self._eval(*args)  # argumen list (mis. untuk stat) tidak bisa jadi kunci memo
+            return self._memo(*args)
+        return self._eval(*args)
+
+    def memo_info(self):
+        return self._memo.cache_info() if self._memo is not None else None
+
+    def __str__(self):
+        return f"{self.name}({', '.join(self.params)}) = {self.body}"
+
+def _update_purity():
+    """Titik tetap: fungsi murni bila setiap nama di badannya parameter, bawaan, atau fungsi pengguna murni.
+    Variabel pengguna bisa berubah, jadi fungsi yang memakainya tidak di-memo."""
+    for f in USER_FUNCS.values(): f.pure = True
+    changed = True
+    while changed:
+        changed = False
+        for f in USER_FUNCS.values():
+            if f.pure and any(n not in f.params and n not in SAFE_FUNCS and n not in _engine_funcs
+                              and not (n in USER_FUNCS and USER_FUNCS[n].pure) for n in f.names):
+                f.pure = False; changed = True
+    for f in USER_FUNCS.values(): f.reset()  # definisi berubah: memo lama tidak berlaku lagi
+
+_IDENT = r"[A-Za-z_]\w*"
+_DEF_RE = re.compile(rf"^\s*({_IDENT})\s*(\(\s*({_IDENT}(?:\s*,\s*{_IDENT})*)?\s*\))?\s*=(?!=)(.*)$")
+
+# Kata perintah REPL (dicocokkan tanpa membedakan huruf besar/kecil): variabel bernama sama tidak bisa dipanggil
+REPL_COMMANDS = frozenset(("conv", "statfile", "prog", "history", "clear", "mode", "vars", "hapus", "simpan", "muat",
+                           "cache", "menu", "main", "help", "bantuan", "exit", "quit", "keluar"))
+
+def _check_name(name):
+    if not isinstance(name, str) or not name.isidentifier():
+        raise ValueError(f"Nama '{name}' tidak valid")
+    if keyword.iskeyword(name) or name in SAFE_FUNCS or name in _engine_funcs:
+        raise ValueError(f"Nama '{name}' sudah dipakai fungsi bawaan")
+    if name.lower() in REPL_COMMANDS:
+        raise ValueError(f"Nama '{name}' sudah dipakai perintah kalkulator")
+
+def _check_params(params):
+    """Parameter fungsi: list identifier unik yang bukan keyword"""
+    if not isinstance(params, list):
+        raise ValueError("Daftar parameter harus berupa list")
+    for p in params:
+        if not isinstance(p, str) or not p.isidentifier() or keyword.iskeyword(p):
+            raise ValueError(f"Parameter '{p}' tidak valid")
+    if len(set(params)) != len(params): raise ValueError("Nama parameter tidak boleh kembar")
+    return params
+
+def eval_input(s):
+    """Evaluasi satu baris: definisi variabel (x = ...), fungsi (f(a) = ...), atau ekspresi biasa"""
+    m = _DEF_RE.match(s)
+    if not m:
+        return safe_eval(s)
+    name, is_func, params, body = m.group(1), m.group(2), m.group(3), m.group(4).strip()
+    if not body: raise ValueError("Definisi tanpa ekspresi")
+    _check_name(name)
+    if not is_func:
+        if name in USER_FUNCS: raise ValueError(f"'{name}' sudah berupa fungsi (hapus {name} dulu)")
+        value = safe_eval(body)
+        _encode_value(value)  # hanya nilai yang bisa disimpan (angka, string, list)
+        USER_VARS[name] = value
+        return value
+    params = _check_params([p.strip() for p in params.split(",")] if params else [])
+    if name in USER_VARS: raise ValueError(f"'{name}' sudah berupa variabel (hapus {name} dulu)")
+    USER_FUNCS[name] = f = UserFunc(name, params, body)
+    _update_purity()
+    return f
+
+def namespace_delete(name):
+    if USER_VARS.pop(name, None) is None and USER_FUNCS.pop(name, None) is None:
+        raise ValueError(f"'{name}' tidak ditemukan")
+    _update_purity()
+
+def _encode_value(v):
+    if isinstance(v, (int, float, str)): return v
+    if isinstance(v, Decimal): return {"decimal": str(v)}
+    if isinstance(v, Fraction): return {"fraction": str(v)}
+    if isinstance(v, list): return [_encode_value(x) for x in v]
+    raise ValueError(f"Nilai bertipe {type(v).__name__} tidak bisa disimpan di variabel")
+
+def _decode_value(v):
+    if isinstance(v, dict):
+        if "decimal" in v: return Decimal(v["decimal"])
+        if "fraction" in v: return Fraction(v["fraction"])
+        raise ValueError("Format nilai tidak dikenal")
+    if isinstance(v, list): return [_decode_value(x) for x in v]
+    return v
+
+def namespace_save(path=None):
+    import json
+    path = path or CALC_NS_FILE
+    data = {"vars": {k: _encode_value(v) for k, v in USER_VARS.items()},
+            "funcs": {k: {"params": list(f.params), "body": f.body} for k, f in USER_FUNCS.items()}}
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=1)
+    os.replace(tmp, path)
+    return len(USER_VARS), len(USER_FUNCS)
+
+def namespace_load(path=None):
+    """Muat namespace dari file JSON (menimpa nama yang sama); kembalikan (jumlah variabel, jumlah fungsi)"""
+    import json
+    with open(path or CALC_NS_FILE, encoding="utf-8") as f:
+        data = json.load(f)
+    vars_ = {k: _decode_value(v) for k, v in data.get("vars", {}).items()}
+    funcs = {}
+    # Setiap fungsi divalidasi (nama, parameter, badan dikompilasi) saat dimuat, bukan saat dipanggil
+    for k, d in data.get("funcs", {}).items():
+        try:
+            _check_name(k)
+            if not isinstance(d, dict) or not isinstance(d.get("body"), str):
+                raise ValueError("entri harus berisi 'params' dan 'body' (teks)")
+            funcs[k] = UserFunc(k, _check_params(d.get("params", [])), d["body"])
+        except (ValueError, SyntaxError, TypeError) as e:
+            msg = e.msg if isinstance(e, SyntaxError) else str(e)
+            raise ValueError(f"Fungsi '{k}' tidak valid di file namespace: {msg}") from None
+    for name in vars_: _check_name(name)
+    for name in vars_: USER_FUNCS.pop(name, None)
+    for name in funcs: USER_VARS.pop(name, None)
+    USER_VARS.update(vars_)
+    USER_FUNCS.update(funcs)
+    _update_purity()
+    return len(vars_), len(funcs)
+
+def namespace_cmd(parts):
+    """Perintah REPL: vars | hapus <nama> | simpan [file] | muat [file]"""
+    cmd = parts[0].lower()
+    try:
+        if cmd == "vars":
+            if not USER_VARS and not USER_FUNCS:
+                print(C_BOX + "Belum ada variabel/fungsi. Contoh: x = 2 * pi   f(a) = a**2 + 1" + W); return
+            for k, v in USER_VARS.items(): print(f" {C_NEON}{k}{W} = {v}")
+            for f in USER_FUNCS.values():
+                info = f.memo_info()
+                memo = f"murni, memo {info.currsize} entri, hit {info.hits}" if info else "tidak di-memo"
+                print(f" {C_NEON}{f}{W}  {C_BOX}[{memo}]{W}")
+        elif cmd == "hapus":
+            if len(parts) != 2: print(R + "Penggunaan: hapus <nama>" + W); return
+            namespace_delete(parts[1]); print(C_BOX + f"'{parts[1]}' dihapus." + W)
+        elif cmd == "simpan":
+            n_var, n_func = namespace_save(parts[1] if len(parts) > 1 else None)
+            print(C_BOX + f"Tersimpan: {n_var} variabel, {n_func} fungsi." + W)
+        elif cmd == "muat":
+            n_var, n_func = namespace_load(parts[1] if len(parts) > 1 else None)
+            print(C_BOX + f"Dimuat: {n_var} variabel, {n_func} fungsi." + W)
+    except (OSError, ValueError, SyntaxError, KeyError, TypeError) as e:
+        print(R + f"Error namespace: {e}" + W)
 
 # --- Fungsi Utilitas (Riwayat, Konversi) ---
+# Riwayat: file append-only (satu baris per entri) + ring deque di memori.
+# Jumlah baris file dilacak agar pemadatan (tulis ulang HIST_MAX baris terakhir) hanya sesekali.
+_hist_file_lines = 0
+
 def history_load():
+    """Baca file sekali ke ring deque dan isi riwayat readline (panah atas)"""
+    global _hist_file_lines
+    hist = deque(maxlen=max(HIST_MAX, 1))
+    lines, unterminated = 0, False
     try:
-        if os.path.exists(HIST_FILE):
-            with open(HIST_FILE) as f:
-                return [l.strip() for l in f.readlines() if l.strip()]
-    except Exception: pass
-    return []
+        with open(HIST_FILE, encoding="utf-8", errors="replace") as f:
+            for l in f:
+                lines += 1
+                unterminated = not l.endswith("\n")
+                l = l.strip()
+                if l: hist.append(l)
+    except OSError: pass
+    _hist_file_lines = lines
+    readline.set_history_length(max(HIST_MAX, 1))
+    for l in hist: readline.add_history(l)
+    # Format lama ditulis tanpa newline penutup; padatkan sekali agar append berikutnya tidak menyambung baris
+    if unterminated or lines > HIST_MAX * HIST_COMPACT_FACTOR:
+        history_compact()
+    return hist
 
-def history_save(hist):
+def history_compact():
+    """Tulis ulang file hanya dengan HIST_MAX entri terakhir (atomik via os.replace).
+    Dibaca dari file, bukan dari ring, agar entri sesi lain yang berjalan bersamaan ikut terjaga."""
+    global _hist_file_lines
     try:
-        with open(HIST_FILE,"w") as f:
-            f.write("\n".join(hist[-200:]))
-    except Exception: pass
+        with open(HIST_FILE, encoding="utf-8", errors="replace") as f:
+            tail = deque((l.strip() for l in f if l.strip()), maxlen=max(HIST_MAX, 1))
+        tmp = HIST_FILE + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.writelines(l + "\n" for l in tail)
+        os.replace(tmp, HIST_FILE)
+        _hist_file_lines = len(tail)
+    except OSError: pass
+
+def history_append(hist, entry):
+    """Tambah satu entri: ring di memori + satu baris di akhir file"""
+    global _hist_file_lines
+    entry = " ".join(entry.split())
+    hist.append(entry)
+    try:
+        with open(HIST_FILE, "a", encoding="utf-8") as f:
+            f.write(entry + "\n")
+        _hist_file_lines += 1
+    except OSError: return
+    if _hist_file_lines > HIST_MAX * HIST_COMPACT_FACTOR:
+        history_compact()
+
+def history_clear(hist):
+    global _hist_file_lines
+    hist.clear()
+    readline.clear_history()
+    try:
+        open(HIST_FILE, "w").close()
+    except OSError: pass
+    _hist_file_lines = 0
 
 def conv_cmd(parts):
     if len(parts) != 3:
@@ -185,6 +824,17 @@ def conv_cmd(parts):
     except Exception: 
         print(R + "Error konversi: Format angka tidak valid." + W)
 
+def engine_cmd(parts):
+    """Perintah REPL: mode [engine] [presisi]"""
+    if len(parts) == 1:
+        print(C_BOX + f"Engine angka: {engine_info()}  (pilihan: {', '.join(CALC_ENGINES)})" + W)
+        return
+    try:
+        set_engine(parts[1], int(parts[2]) if len(parts) > 2 else None)
+        print(C_BOX + f"Engine angka diganti: {engine_info()}" + W)
+    except ValueError as e:
+        print(R + f"Error: {e}" + W)
+
 def prog_view(x):
     try:
         n = int(x, 0)
@@ -214,10 +864,13 @@ def display_main_menu():
     print("\n" + C_BOX + "1. PERHITUNGAN DASAR & ILMIAH (TIPE: Ekspresi)" + W)
     print(f"   • Ketik ekspresi matematika: {BOLD}10 * (sin(pi/6)) + akar(81){W}")
     print(f"   • {C_NEON}Fitur Canggih:{W} Mendukung: {BOLD}+, -, *, /, **, %{W} dan fungsi ilmiah.")
+    print(f"   • Variabel & fungsi: {BOLD}r = 7{W}, {BOLD}f(a) = a**2 + 1{W}, lalu {BOLD}f(r){W}; {BOLD}vars{W} / {BOLD}simpan{W}")
+    print(f"   • {BOLD}mode decimal 100{W} / {BOLD}mode fraction{W} : Hitung eksak (0.1 + 0.2 = 0.3). Engine: {C_NEON}{engine_info()}{W}")
     
     print("\n" + C_BOX + "2. STATISTIK 📊 & GEOMETRI 📐 (FITUR CANGGIH: Fungsi Khusus)" + W)
     print(f"   • {BOLD}stat([angka, ...]){W} : Hitung Rata-rata, Median, Modus.")
     print(f"     Contoh: {C_NEON}stat([1, 2, 2, 4, 6]){W}")
+    print(f"   • {BOLD}statfile <file> [kolom]{W} : Statistik data dari file CSV/teks.")
     print(f"   • {BOLD}luas('jenis', arg1, ...){W} : Hitung Luas Bangun Datar.")
     print(f"     Contoh: {C_NEON}luas('lingkaran', 7){W}")
     
@@ -232,6 +885,9 @@ def display_main_menu():
 # --- Fungsi Utama REPL (Read-Eval-Print Loop) ---
 def repl():
     hist = history_load()
+    if os.path.exists(CALC_NS_FILE):
+        try: namespace_load()
+        except (OSError, ValueError, SyntaxError, KeyError, TypeError): pass  # file rusak tidak menghalangi REPL
     display_main_menu() # Panggil menu di awal
     
     while True:
@@ -253,7 +909,8 @@ def repl():
 {C_NEON}{BOLD}Panduan Penggunaan Lengkap Erald Calculator{W}
 
 {C_BOX}FUNGSI STATISTIK, GEOMETRI & WAKTU:{W}
-   • {BOLD}stat([angka, ...]){W} : Mean, Median, Modus (Contoh: stat([1, 2, 3]))
+   • {BOLD}stat([angka, ...]){W} : Mean, Median, Modus, Varians, Persentil (Contoh: stat([1, 2, 3]))
+   • {BOLD}statfile <file> [kolom]{W} : Statistik dari file CSV / satu angka per baris (jutaan data)
    • {BOLD}luas('jenis', arg1, ...){W} : Luas bangun datar.
    • {BOLD}umur(YYYY){W}, {BOLD}hari_sejak(YYYY,MM,DD){W}
 
@@ -262,30 +919,45 @@ def repl():
 (Contoh penggunaan: {BOLD}akar(25){W}, {BOLD}bulatkan(3.1415, 2){W})
 
 {C_BOX}Perintah Utilitas Tambahan:{W}
-   • {BOLD}prog <angka>{W}, {BOLD}conv <angka> <basis>{W}, {BOLD}menu{W}, {BOLD}history{W}, {BOLD}clear{W}.
+   • {BOLD}prog <angka>{W}, {BOLD}conv <angka> <basis>{W}, {BOLD}menu{W}, {BOLD}history{W}, {BOLD}clear{W}, {BOLD}cache{W}.
+   • {BOLD}mode [float|decimal|fraction] [presisi]{W} : Engine angka (sekarang: {engine_info()}).
+
+{C_BOX}VARIABEL & FUNGSI PENGGUNA:{W}
+   • {BOLD}x = 2 * pi{W}, {BOLD}f(a, b) = a**2 + b{W} lalu {BOLD}f(x, 1){W} (fungsi murni di-memo)
+   • {BOLD}vars{W}, {BOLD}hapus <nama>{W}, {BOLD}simpan [file]{W}, {BOLD}muat [file]{W} (otomatis dimuat saat mulai)
 """)
             continue
         
-        # Command Handling
+        # Command Handling (definisi 'nama = ...' tidak pernah dianggap perintah, mis. 'clear = 5')
         parts = s.split()
-        cmd = parts[0].lower()
+        cmd = "" if _DEF_RE.match(s) else parts[0].lower()
         
         if cmd == "conv":
-            conv_cmd(parts); hist.append(s); history_save(hist); continue
+            conv_cmd(parts); history_append(hist, s); continue
+        elif cmd == "statfile":
+            statfile_cmd(parts); history_append(hist, s); continue
         elif cmd == "prog":
-            if len(parts) > 1: prog_view(parts[1]); hist.append(s); history_save(hist); continue
+            if len(parts) > 1: prog_view(parts[1]); history_append(hist, s); continue
             else: print(R + "Error: Perintah prog memerlukan argumen angka." + W); continue
         elif cmd == "history":
             print(C_BOX + "--- RIWAYAT PERHITUNGAN (50 terakhir) ---" + W)
-            for i,l in enumerate(hist[-50:],start=1): print(f"{C_NEON}{i:02}.{W} {l}")
+            for i,l in enumerate(islice(hist, max(len(hist) - 50, 0), None),start=1): print(f"{C_NEON}{i:02}.{W} {l}")
             print(C_BOX + "----------------------------------------" + W)
             continue
         elif cmd == "clear":
-            hist = []; history_save(hist); print(C_BOX + "Riwayat telah dihapus." + W); continue
+            history_clear(hist); print(C_BOX + "Riwayat telah dihapus." + W); continue
+        elif cmd == "mode":
+            engine_cmd(parts); continue
+        elif cmd in ("vars", "hapus", "simpan", "muat"):
+            namespace_cmd(parts); continue
+        elif cmd == "cache":
+            info = compile_expr.cache_info()
+            print(C_BOX + f"Cache ekspresi: {info.currsize}/{info.maxsize} entri, hit {info.hits}, miss {info.misses}" + W)
+            continue
         
         # Expression Evaluation
         try:
-            res = safe_eval(s)
+            res = eval_input(s)
             
             # Tampilan Hasil yang Menonjol dan Profesional
             print(C_BOX + BOLD + "┌— HASIL —" + W)
@@ -298,13 +970,181 @@ def repl():
             
             print(C_BOX + BOLD + "└—————————" + W)
             
-            hist.append(s); history_save(hist)
+            history_append(hist, s)
         except Exception as e:
             # Tampilan Error Merah Terang
             print(R + BOLD + "!! ERROR PERHITUNGAN !!" + W)
             print(R + str(e) + W)
 
+# --- Mode Batch / Pipe (tanpa banner, tanpa riwayat) ---
+_batch_worker = False  # True di proses pool: namespace tidak dibagi antar proses
+
+def _init_batch_worker(engine, prec):
+    global _batch_worker
+    _batch_worker = True
+    set_engine(engine, prec)
+
+def eval_line(expr):
+    """Evaluasi satu baris; kembalikan (hasil, pesan_error) tanpa melempar exception"""
+    try:
+        if _batch_worker and _DEF_RE.match(expr):
+            raise ValueError("Definisi variabel/fungsi tidak didukung dengan --jobs > 1")
+        return eval_input(expr), None
+    except Exception as e:
+        return None, str(e) or type(e).__name__
+
+def _picklable(item):
+    """Hasil dari proses pool harus bisa di-pickle (mis. 'umur' berupa lambda tidak bisa):
+    jadikan teks seperti output -j 1; bila tetap gagal laporkan sebagai error baris itu saja"""
+    res, err = item
+    try:
+        pickle.dumps(res)
+        return item
+    except Exception:
+        pass
+    try:
+        return str(res).strip(), None
+    except Exception as e:
+        return None, f"Hasil tidak bisa dikirim dari proses worker: {e}"
+
+def _eval_chunk(lines):
+    results = [eval_line(l) for l in lines]
+    return [_picklable(r) for r in results] if _batch_worker else results
+
+def _batch_lines(f):
+    """Baris ekspresi dari file: lewati baris kosong dan komentar '#'"""
+    for line in f:
+        line = line.strip()
+        if line and not line.startswith("#"):
+            yield line
+
+def _chunks(it, size):
+    it = iter(it)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk: return
+        yield chunk
+
+def iter_batch(lines, jobs=1, chunk=BATCH_CHUNK):
+    """Hasilkan (ekspresi, hasil, error) berurutan. jobs > 1 membagi potongan baris ke pool proses;
+    tiap proses memakai cache compile_expr sendiri. Tanpa dukungan multiprocessing kembali ke satu proses."""
+    chunks = _chunks(lines, max(1, chunk))
+    pool = None
+    if jobs > 1:
+        try:
+            import multiprocessing
+            # Engine & presisi diteruskan ke proses anak (start method spawn tidak mewarisi state modul)
+            pool = multiprocessing.Pool(jobs, initializer=_init_batch_worker, initargs=(_engine, decimal.getcontext().prec))
+        except (ImportError, OSError):
+            pool = None  # mis. Android tanpa sem_open
+    try:
+        if pool is None:
+            for c in chunks:
+                yield from ((expr, res, err) for expr, (res, err) in zip(c, _eval_chunk(c)))
+            return
+        # Paling banyak 2*jobs potongan dalam proses; potongan berikutnya baru dibaca setelah yang tertua
+        # selesai dan di-yield, jadi input dari pipe tetap di-stream dengan memori terbatas
+        inflight = deque()
+        for c in islice(chunks, 2 * jobs):
+            inflight.append((c, pool.apply_async(_eval_chunk, (c,))))
+        while inflight:
+            c, job = inflight.popleft()
+            results = job.get()
+            for nxt in islice(chunks, 1):
+                inflight.append((nxt, pool.apply_async(_eval_chunk, (nxt,))))
+            yield from ((expr, res, err) for expr, (res, err) in zip(c, results))
+    finally:
+        if pool is not None:
+            pool.terminate()
+
+def batch_value(res):
+    """Nilai hasil untuk JSON: angka tetap angka (NaN/inf dan tipe lain jadi string)"""
+    if isinstance(res, bool) or res is None: return res
+    if isinstance(res, int): return res
+    if isinstance(res, float): return res if math.isfinite(res) else str(res)
+    if isinstance(res, list): return [batch_value(v) for v in res]
+    return str(res).strip()
+
+def run_batch(sumber="-", fmt="text", jobs=CALC_JOBS, out=None):
+    """Evaluasi banyak ekspresi dari file/stdin; kembalikan exit code (1 bila ada error)"""
+    import json
+    out = out or sys.stdout
+    f = sys.stdin if sumber == "-" else open(sumber, encoding="utf-8", errors="replace")
+    errors = 0
+    try:
+        if fmt == "json": out.write("[")
+        first = True
+        for expr, res, err in iter_batch(_batch_lines(f), jobs=jobs):
+            errors += err is not None
+            if fmt == "text":
+                out.write(f"ERROR: {err}\n" if err is not None else f"{str(res).strip()}\n")
+                continue
+            rec = {"expr": expr, "result": batch_value(res)} if err is None else {"expr": expr, "error": err}
+            line = json.dumps(rec, ensure_ascii=False)
+            if fmt == "json":
+                out.write(("\n  " if first else ",\n  ") + line)
+                first = False
+            else:
+                out.write(line + "\n")
+        if fmt == "json": out.write("\n]\n" if not first else "]\n")
+        out.flush()
+    finally:
+        if f is not sys.stdin: f.close()
+    return 1 if errors else 0
+
+def disable_colors():
+    """Kosongkan kode ANSI untuk output non-TTY (pipe/file)"""
+    global R, G, C_BOX, C_NEON, C_RESULT, W, BOLD, ULINE
+    R = G = C_BOX = C_NEON = C_RESULT = W = BOLD = ULINE = ""
+
 if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="EraldForge Calculator")
+    parser.add_argument("--stat", metavar="FILE", help="Statistik data dari file CSV / satu angka per baris ('-' = stdin)")
+    parser.add_argument("--col", type=int, help="Dengan --stat: indeks kolom CSV (mulai 0)")
+    parser.add_argument("--bins", type=int, default=STAT_BINS, help="Dengan --stat: jumlah bin histogram")
+    parser.add_argument("--json", action="store_true", help="Dengan --stat: output JSON (mode batch: sama dengan --format json)")
+    parser.add_argument("-b", "--batch", nargs="?", const="-", metavar="FILE",
+                        help="Mode batch: evaluasi satu ekspresi per baris dari FILE atau stdin ('-'); otomatis bila stdin bukan TTY")
+    parser.add_argument("-f", "--format", choices=BATCH_FORMATS, help="Format output mode batch (default: text)")
+    parser.add_argument("-j", "--jobs", type=int, default=CALC_JOBS, help="Mode batch: jumlah proses evaluasi paralel")
+    parser.add_argument("--engine", choices=CALC_ENGINES + tuple(_ENGINE_ALIASES), help="Engine angka: float, decimal, fraction")
+    parser.add_argument("--prec", type=int, help="Presisi engine decimal (digit)")
+    args = parser.parse_args()
+    if args.engine or args.prec:
+        try:
+            set_engine(args.engine or _engine, args.prec)
+        except ValueError as e:
+            parser.error(str(e))
+    if args.stat:
+        if not sys.stdout.isatty():
+            disable_colors()
+        try:
+            data, skipped = baca_data(args.stat, args.col)
+            st = hitung_statistik_vektor(data, bins=max(1, args.bins))
+        except (OSError, ValueError) as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
+        if args.json:
+            import json
+            st["dilewati"] = skipped
+            print(json.dumps(st, indent=2))
+        else:
+            print(format_statistik(st))
+            if skipped:
+                print(f"   ({skipped} token non-angka dilewati)", file=sys.stderr)
+        sys.exit(0)
+    if args.batch or not sys.stdin.isatty():
+        if not sys.stdout.isatty():
+            disable_colors()
+        fmt = args.format or ("json" if args.json else "text")
+        try:
+            sys.exit(run_batch(args.batch or "-", fmt, max(1, args.jobs)))
+        except (BrokenPipeError, KeyboardInterrupt):
+            sys.exit(1)
+        except OSError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
     if readline.get_current_history_length() > 0:
         readline.clear_history()
     repl()
\ No newline at end of file
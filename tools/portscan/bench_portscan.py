@@ -0,0 +1,319 @@
+#!/data/data/com.termux/files/usr/bin/env python3
+# EraldForge - Benchmark Port Scanner
+# Fixture listener lokal (loopback) dengan port open, closed dan delayed yang sudah diketahui,
+# lalu setiap engine scan diukur: port/detik, latency p50/p99, CPU time, peak RSS, akurasi.
+#
+# Contoh:
+#   python bench_portscan.py                          # engine async + thread, simpan JSON
+#   python bench_portscan.py --engines async --timeout 0.3 --workers 200 --repeat 3
+#   python bench_portscan.py --compare hasil_lama.json   # bandingkan dengan hasil sebelumnya
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import resource
+import socket
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+BENCH_DIR = Path(os.environ.get("ERALDFORGE_BENCH_DIR", str(Path.home() / ".eraldforge_bench")))
+BENCH_HOST = "127.0.0.1"
+
+# ---------------- Fixtures ----------------
+class ListenerFixtures:
+    """Port open (listener biasa), delayed (backlog penuh: SYN di-drop sampai dilepas setelah `delay` detik)
+    dan closed (tidak ada listener) pada rentang port loopback."""
+
+    def __init__(self, base, count, n_open, n_delayed, delay, seed=1337):
+        self.base, self.count = base, count
+        self.n_open, self.n_delayed, self.delay = n_open, n_delayed, delay
+        self.rng = random.Random(seed)
+        self.open, self.delayed, self.closed = [], [], []
+        self._socks = []
+        self._stop = threading.Event()
+        self._threads = []
+
+    def _bind(self, port, backlog):
+        s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            s.bind((BENCH_HOST, port))
+        except OSError:
+            s.close()
+            return None
+        s.listen(backlog)
+        return s
+
+    def _port_free(self, port):
+        with socket.socket() as s:
+            s.settimeout(0.2)
+            return s.connect_ex((BENCH_HOST, port)) != 0
+
+    def start(self):
+        ports = [p for p in range(self.base, self.base + self.count) if self._port_free(p)]
+        if len(ports) < self.n_open + self.n_delayed + 1:
+            raise RuntimeError(f"Rentang port {self.base}-{self.base+self.count-1} terlalu banyak yang terpakai")
+        chosen = self.rng.sample(ports, self.n_open + self.n_delayed)
+        for p in chosen[:self.n_open]:
+            s = self._bind(p, 128)
+            if s:
+                self.open.append(p)
+                self._socks.append(s)
+                self._serve(s)
+        for p in chosen[self.n_open:]:
+            s = self._bind(p, 0)
+            if s and self._fill_backlog(p):
+                self.delayed.append(p)
+                self._socks.append(s)
+                self._release_later(s)
+            elif s:
+                s.close()
+        taken = set(self.open) | set(self.delayed)
+        self.closed = [p for p in ports if p not in taken]
+        return self
+
+    def _fill_backlog(self, port, max_fill=8):
+        """Isi accept queue sampai connect berikutnya tidak lagi selesai (SYN di-drop kernel)"""
+        for _ in range(max_fill):
+            c = socket.socket()
+            c.setblocking(False)
+            c.connect_ex((BENCH_HOST, port))
+            self._socks.append(c)
+            time.sleep(0.02)
+            try:
+                c.getpeername()
+            except OSError:
+                return True  # handshake tidak selesai: backlog sudah penuh
+        return False
+
+    def _serve(self, srv):
+        def loop():
+            srv.settimeout(0.2)
+            while not self._stop.is_set():
+                try:
+                    conn, _ = srv.accept()
+                    conn.close()
+                except (socket.timeout, OSError):
+                    continue
+        t = threading.Thread(target=loop, daemon=True)
+        t.start()
+        self._threads.append(t)
+
+    def _release_later(self, srv):
+        def release():
+            if not self._stop.wait(self.delay):
+                self._serve(srv)
+        t = threading.Thread(target=release, daemon=True)
+        t.start()
+        self._threads.append(t)
+
+    def expected(self):
+        truth = {p: "open" for p in self.open + self.delayed}
+        truth.update({p: "closed" for p in self.closed})
+        return truth
+
+    def stop(self):
+        self._stop.set()
+        for t in self._threads:
+            t.join(timeout=1)
+        for s in self._socks:
+            try:
+                s.close()
+            except OSError:
+                pass
+
+# ---------------- Child: satu engine, satu proses ----------------
+def percentile(values, pct):
+    """Persentil nearest-rank; None kalau kosong"""
+    if not values:
+        return None
+    values = sorted(values)
+    k = max(0, min(len(values) - 1, int(round(pct / 100.0 * len(values) + 0.5)) - 1))
+    return values[k]
+
+def run_child(spec):
+    """Dijalankan di proses terpisah agar CPU time dan peak RSS terukur per engine"""
+    sys.path.insert(0, str(HERE))
+    import port_scanner as ps
+
+    ps.DEFAULT_TIMEOUT = spec["timeout"]
+    ps.MAX_WORKERS = spec["workers"]
+    ps.MAX_CONCURRENCY = spec["workers"]
+    ps.HOST_DISCOVERY = False
+    ps.GRAB_BANNERS = False
+    ps.PROBE_RATE = spec.get("rate", 0)
+    ports = spec["ports"]
+    engine = spec["engine"]
+
+    states, latencies = {}, []
+    cpu0 = time.process_time()
+    t0 = time.perf_counter()
+    # Output berwarna scanner dialihkan ke stderr; stdout khusus JSON hasil
+    with contextlib.redirect_stdout(sys.stderr):
+        if engine == "nmap":
+            opens = ps.run_nmap(BENCH_HOST, ["-p", ",".join(map(str, ports)), "-Pn", "-n"]).get(BENCH_HOST, [])
+            states = {p: "closed" for p in ports}
+            states.update({p: "open" for p in opens})
+        else:
+            for res in ps.iter_scan([BENCH_HOST], ports, engine):
+                states[res.port] = res.state
+                if res.latency is not None:
+                    latencies.append(res.latency)
+    wall = time.perf_counter() - t0
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    # Proses worker engine shard ikut dihitung: CPU dijumlah, RSS diambil yang terbesar
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    cpu = time.process_time() - cpu0 + children.ru_utime + children.ru_stime
+    # ru_maxrss: KiB di Linux, byte di macOS
+    rss_kb = max(usage.ru_maxrss, children.ru_maxrss)
+    rss_kb = rss_kb // 1024 if sys.platform == "darwin" else rss_kb
+    json.dump({"wall": wall, "cpu": cpu, "peak_rss_kb": rss_kb,
+               "latencies": latencies, "states": {str(p): s for p, s in states.items()}}, sys.stdout)
+
+def run_engine(engine, fixtures, args):
+    spec = {"engine": engine, "timeout": args.timeout, "workers": args.workers, "rate": args.rate,
+            "ports": list(range(args.base, args.base + args.count))}
+    proc = subprocess.run([sys.executable, str(Path(__file__).resolve()), "--child"],
+                          input=json.dumps(spec), capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"engine {engine} gagal: {proc.stderr.strip()[-400:]}")
+    raw = json.loads(proc.stdout)
+    states = {int(p): s for p, s in raw["states"].items()}
+    truth = fixtures.expected()
+
+    def accuracy(ports):
+        if not ports:
+            return None
+        return round(sum(states.get(p) == truth[p] for p in ports) / len(ports), 4)
+
+    lat_ms = [x * 1000 for x in raw["latencies"]]
+    return {
+        "engine": engine,
+        "ports": len(spec["ports"]),
+        "wall_s": round(raw["wall"], 4),
+        "ports_per_s": round(len(spec["ports"]) / raw["wall"], 1) if raw["wall"] else None,
+        "latency_p50_ms": round(percentile(lat_ms, 50), 3) if lat_ms else None,
+        "latency_p99_ms": round(percentile(lat_ms, 99), 3) if lat_ms else None,
+        "cpu_s": round(raw["cpu"], 4),
+        "peak_rss_kb": raw["peak_rss_kb"],
+        "accuracy": accuracy(list(truth)),
+        "accuracy_open": accuracy(fixtures.open),
+        "accuracy_closed": accuracy(fixtures.closed),
+        "accuracy_delayed": accuracy(fixtures.delayed),
+        "missed_open": sorted(p for p in fixtures.open + fixtures.delayed if states.get(p) != "open"),
+    }
+
+# ---------------- Laporan ----------------
+COLUMNS = [("engine", "engine", 8), ("ports_per_s", "port/s", 10), ("latency_p50_ms", "p50 ms", 9),
+           ("latency_p99_ms", "p99 ms", 9), ("cpu_s", "cpu s", 8), ("peak_rss_kb", "rss KiB", 9),
+           ("accuracy", "akurasi", 8), ("accuracy_delayed", "delayed", 8)]
+
+def print_table(runs):
+    print("  ".join(title.rjust(w) for _, title, w in COLUMNS))
+    for run in runs:
+        print("  ".join(str(run.get(key, "-")).rjust(w) for key, _, w in COLUMNS))
+
+# Parameter yang menentukan beban kerja; hasil hanya sebanding jika semuanya sama
+COMPARE_PARAMS = ("count", "open", "delayed", "delay", "timeout", "workers", "rate")
+
+def compare(runs, old_path, params):
+    """Bandingkan median per engine dengan file JSON sebelumnya (regresi throughput/akurasi).
+    Dilewati jika parameter beban kerja berbeda. Return True jika perbandingan dilakukan"""
+    old = json.loads(Path(old_path).read_text())
+    old_params = old.get("params") or {}
+    diff = [f"{k}: {old_params.get(k, '?')} -> {params.get(k)}" for k in COMPARE_PARAMS if old_params.get(k) != params.get(k)]
+    if diff:
+        print(f"[!] PERBANDINGAN DILEWATI: parameter benchmark berbeda dengan {old_path}", file=sys.stderr)
+        for line in diff:
+            print(f"    {line}", file=sys.stderr)
+        return False
+    old_by_engine = {r["engine"]: r for r in old.get("summary", [])}
+    for run in runs:
+        prev = old_by_engine.get(run["engine"])
+        if not prev:
+            continue
+        speed = (run["ports_per_s"] or 0) / prev["ports_per_s"] - 1 if prev.get("ports_per_s") else 0
+        acc = (run["accuracy"] or 0) - (prev.get("accuracy") or 0)
+        flag = "  <-- REGRESI" if speed < -0.10 or acc < 0 else ""
+        print(f"{run['engine']:8} port/s {speed*100:+.1f}%  akurasi {acc*100:+.2f} pt{flag}")
+    return True
+
+def summarize(runs):
+    """Median per engine dari beberapa repetisi"""
+    summary = []
+    for engine in dict.fromkeys(r["engine"] for r in runs):
+        group = [r for r in runs if r["engine"] == engine]
+        merged = {"engine": engine, "repeat": len(group)}
+        for key in group[0]:
+            vals = [r[key] for r in group if isinstance(r.get(key), (int, float))]
+            if vals and key != "ports":
+                merged[key] = percentile(vals, 50)
+        merged["ports"] = group[0]["ports"]
+        summary.append(merged)
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark engine port scanner pada fixture loopback")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--engines", default="async,thread", help="Daftar engine (async,thread,shard,nmap)")
+    parser.add_argument("--base", type=int, default=41000, help="Port awal rentang fixture")
+    parser.add_argument("--count", type=int, default=2000, help="Jumlah port yang discan")
+    parser.add_argument("--open", type=int, default=40, help="Jumlah port open")
+    parser.add_argument("--delayed", type=int, default=4, help="Jumlah port delayed (backlog penuh)")
+    parser.add_argument("--delay", type=float, default=0.5, help="Detik sebelum port delayed mulai menerima")
+    parser.add_argument("--timeout", type=float, default=float(os.environ.get("ERALDFORGE_SCAN_TIMEOUT", "0.45")))
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("ERALDFORGE_SCAN_WORKERS", "120")))
+    parser.add_argument("--rate", type=float, default=0, help="Batas probe/detik (0 = tanpa batas)")
+    parser.add_argument("--repeat", type=int, default=1, help="Ulangi setiap engine N kali (median dilaporkan)")
+    parser.add_argument("--out", help="File JSON hasil (default ~/.eraldforge_bench/portscan-<waktu>.json)")
+    parser.add_argument("--compare", help="File JSON sebelumnya untuk deteksi regresi")
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(json.load(sys.stdin))
+        return
+
+    engines = [e.strip() for e in args.engines.split(",") if e.strip()]
+    runs = []
+    for i in range(args.repeat):
+        for engine in engines:
+            # Fixture dibuat ulang setiap run: port delayed hanya "lambat" sekali
+            fixtures = ListenerFixtures(args.base, args.count, args.open, args.delayed, args.delay, seed=1337 + i).start()
+            try:
+                run = run_engine(engine, fixtures, args)
+            except RuntimeError as e:
+                print(f"[!] {e}", file=sys.stderr)
+                continue
+            finally:
+                fixtures.stop()
+            runs.append(run)
+            print(f"[{i+1}/{args.repeat}] {engine}: {run['ports_per_s']} port/s, akurasi {run['accuracy']}", file=sys.stderr)
+
+    if not runs:
+        sys.exit(1)
+    summary = summarize(runs)
+    print_table(summary)
+    result = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "host": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+        "params": {k: v for k, v in vars(args).items() if k not in ("child", "out", "compare")},
+        "summary": summary,
+        "runs": runs,
+    }
+    out = Path(args.out) if args.out else BENCH_DIR / f"portscan-{datetime.now():%Y%m%d-%H%M%S}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(result, indent=2))
+    print(f"Hasil disimpan: {out}")
+    if args.compare:
+        compare(summary, args.compare, result["params"])
+
+if __name__ == "__main__":
+    main()
@@ -2,22 +2,107 @@
 # EraldForge - Port Scanner (Erald Edition Upgraded)
 # By Gerald (G-R4L) — enhanced: banner, menu, nmap detection, socket fallback, logging, auto-scan
 
+import asyncio
+import base64
+import contextlib
+import gzip
+import hashlib
+import heapq
+import json
+import multiprocessing
+import multiprocessing.connection
 import os
+import re
 import subprocess
 import socket
 import sys
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
 from datetime import datetime
 from pathlib import Path
 import argparse
+import ipaddress
+import tempfile
+import selectors
+import signal
+import ssl
+import struct
+import threading
+import xml.etree.ElementTree as ET
+import zlib
+from array import array
+from collections import namedtuple
+
+# sqlite3 opsional (beberapa build Python minimal tidak menyertakannya): fallback ke log teks
+try:
+    import sqlite3
+except ImportError:
+    sqlite3 = None
 
 # ---------------- Configuration (Variables Global) ----------------
 # Ambil nilai dari environment Termux/Linux atau gunakan default
-SCAN_LOG = Path.home() / ".eraldforge_portscan.log"
+SCAN_LOG = Path.home() / ".eraldforge_portscan.log"  # log teks lama (diimpor sekali ke SCAN_DB)
+CHECKPOINT_FILE = Path.home() / ".eraldforge_portscan.ckpt.gz"
+# Interval (detik) penyimpanan checkpoint saat scan socket berjalan
+CHECKPOINT_INTERVAL = float(os.environ.get("ERALDFORGE_SCAN_CHECKPOINT_INTERVAL", "10"))
+SCAN_DB = Path(os.environ.get("ERALDFORGE_SCAN_DB", str(Path.home() / ".eraldforge_portscan.db")))
 # Gunakan mekanisme env var agar mudah diubah dari luar
 DEFAULT_TIMEOUT = float(os.environ.get("ERALDFORGE_SCAN_TIMEOUT", "0.45"))
 MAX_WORKERS = int(os.environ.get("ERALDFORGE_SCAN_WORKERS", "120"))
+# Engine socket: "async" (asyncio, ribuan connect non-blocking), "thread" (ThreadPoolExecutor)
+# atau "shard" (ruang (host, port) dibagi ke beberapa proses, masing-masing dengan event loop sendiri)
+SCAN_ENGINE = os.environ.get("ERALDFORGE_SCAN_ENGINE", "async").strip().lower()
+# Batas koneksi yang sedang berjalan bersamaan untuk engine async
+MAX_CONCURRENCY = int(os.environ.get("ERALDFORGE_SCAN_CONCURRENCY", "1000"))
+# Batas koneksi bersamaan per host (berlaku untuk kedua engine)
+MAX_HOST_CONCURRENCY = int(os.environ.get("ERALDFORGE_SCAN_HOST_CONCURRENCY", "256"))
+SOCKET_ENGINES = ("async", "thread", "shard")
+# Jumlah proses worker untuk engine shard (0 = jumlah core CPU)
+SCAN_PROCESSES = int(os.environ.get("ERALDFORGE_SCAN_PROCESSES", "0"))
+# Timeout adaptif: estimasi RTT per host menentukan timeout tiap probe (DEFAULT_TIMEOUT = nilai awal)
+ADAPTIVE_TIMEOUT = os.environ.get("ERALDFORGE_SCAN_ADAPTIVE", "1") != "0"
+MIN_TIMEOUT = float(os.environ.get("ERALDFORGE_SCAN_MIN_TIMEOUT", "0.05"))
+MAX_TIMEOUT = float(os.environ.get("ERALDFORGE_SCAN_MAX_TIMEOUT", "3.0"))
+# Berapa kali port "filtered" (timeout) diulang; port open/closed tidak pernah diulang
+SCAN_RETRIES = int(os.environ.get("ERALDFORGE_SCAN_RETRIES", "1"))
+# Rate limit (probe/detik, 0 = tanpa batas): global dan per host, token bucket
+PROBE_RATE = float(os.environ.get("ERALDFORGE_SCAN_RATE", "0"))
+HOST_PROBE_RATE = float(os.environ.get("ERALDFORGE_SCAN_HOST_RATE", "0"))
+# Protokol scan socket: "tcp" (connect scan) atau "udp" (probe payload + inferensi ICMP)
+SCAN_PROTO = os.environ.get("ERALDFORGE_SCAN_PROTO", "tcp").strip().lower()
+UDP_SOCKETS = int(os.environ.get("ERALDFORGE_UDP_SOCKETS", "4"))
+UDP_TIMEOUT = float(os.environ.get("ERALDFORGE_UDP_TIMEOUT", "1.0"))
+UDP_RETRIES = int(os.environ.get("ERALDFORGE_UDP_RETRIES", "1"))
+# Jumlah probe UDP yang boleh menunggu jawaban bersamaan
+UDP_WINDOW = int(os.environ.get("ERALDFORGE_UDP_WINDOW", "512"))
+# Host discovery sebelum scan multi-host: hanya host hidup yang mendapat daftar port penuh
+HOST_DISCOVERY = os.environ.get("ERALDFORGE_SCAN_DISCOVERY", "1") != "0"
+DISCOVERY_PORTS = [80, 443, 22, 445, 3389, 139, 8080, 53]
+DISCOVERY_TIMEOUT = float(os.environ.get("ERALDFORGE_DISCOVERY_TIMEOUT", "1.0"))
+# Tahap kedua opsional: banner grabbing & fingerprint layanan untuk port open
+GRAB_BANNERS = os.environ.get("ERALDFORGE_SCAN_BANNERS", "0") == "1"
+BANNER_TIMEOUT = float(os.environ.get("ERALDFORGE_BANNER_TIMEOUT", "3.0"))
+BANNER_CONCURRENCY = int(os.environ.get("ERALDFORGE_BANNER_CONCURRENCY", "64"))
+# Umur cache hasil fingerprint per (host, port) dalam detik
+BANNER_TTL = float(os.environ.get("ERALDFORGE_BANNER_TTL", "86400"))
+# Resolver DNS dual-stack: cache bersama dengan TTL, lookup paralel untuk daftar target
+# ERALDFORGE_SCAN_FAMILY: auto (urutan getaddrinfo/RFC 6724), 4 (IPv4 saja) atau 6 (IPv6 saja)
+ADDRESS_FAMILY = os.environ.get("ERALDFORGE_SCAN_FAMILY", "auto").strip().lower()
+RESOLVE_TTL = float(os.environ.get("ERALDFORGE_RESOLVE_TTL", "300"))
+RESOLVE_WORKERS = int(os.environ.get("ERALDFORGE_RESOLVE_WORKERS", "32"))
+# Batas jumlah host hasil ekspansi CIDR/rentang (mencegah salah ketik /8)
+MAX_TARGETS = int(os.environ.get("ERALDFORGE_SCAN_MAX_TARGETS", "65536"))
+# Mode "top" / "auto": N port teratas dari tabel peringkat (top_ports.txt atau nmap-services)
+TOP_PORT_COUNT = int(os.environ.get("ERALDFORGE_SCAN_TOP_PORTS", "100"))
+TOP_PORTS_FILE = os.environ.get("ERALDFORGE_TOP_PORTS_FILE", "").strip()
+NMAP_SERVICES_PATHS = [
+    os.path.join(os.environ.get("PREFIX", "/usr"), "share", "nmap", "nmap-services"),  # Termux
+    "/usr/share/nmap/nmap-services",
+    "/usr/local/share/nmap/nmap-services",
+]
+# Cadangan bila tabel peringkat tidak ditemukan
+TOP_PORTS = [22,80,443,21,23,25,53,110,143,445,3389,3306,8080]
+TOP_UDP_PORTS = [53,67,69,123,137,161,162,500,514,520,1900,4500,5353,11211]
 # Global TARGET untuk diisi dari Environment Variable ERALDFORGE_TARGET
 TARGET = os.environ.get("ERALDFORGE_TARGET", "").strip()
 
@@ -59,67 +144,1684 @@ def has_nmap():
     except Exception:
         return False
 
-def run_nmap(target, extra_args=None):
-    """Menjalankan Nmap sebagai proses eksternal"""
+def iter_nmap_hosts(stream, protocol="tcp"):
+    """Parse XML nmap (-oX -) secara bertahap dengan iterparse.
+    Yield (host, [open ports]) setiap elemen <host> selesai; elemen yang sudah diproses
+    dibuang sehingga memori tetap kecil untuk scan besar."""
+    context = ET.iterparse(stream, events=("start", "end"))
+    _event, root = next(context)
+    for event, elem in context:
+        if event != "end" or elem.tag != "host":
+            continue
+        # Pakai nama yang diketik user (type="user") agar key sama dengan engine socket
+        name = None
+        for hn in elem.iter("hostname"):
+            if hn.get("type") == "user":
+                name = hn.get("name")
+                break
+        if name is None:
+            addr = elem.find("address[@addrtype='ipv4']")
+            if addr is None:
+                addr = elem.find("address")
+            name = addr.get("addr") if addr is not None else "?"
+        opens = []
+        for port in elem.iter("port"):
+            state = port.find("state")
+            if state is not None and state.get("state") == "open" and port.get("protocol") == protocol:
+                opens.append(int(port.get("portid")))
+        yield name, sorted(opens)
+        root.clear()
+
+def _nmap_is_ipv6(targets):
+    """{target: True jika IPv6}. IP literal/CIDR/rentang dilihat dari sintaksnya; nama host memakai
+    alamat pertama dari resolver cache (pilihan yang sama dengan engine socket)"""
+    names = [t for t in targets if not is_ip_literal(t) and "/" not in t and ":" not in t
+             and not re.fullmatch(r"[\d.\-]+", t)]
+    resolved = _resolver.resolve_many(names) if names else {}
+    return {t: ":" in t or bool(resolved.get(t)) and ":" in resolved[t][0] for t in targets}
+
+def run_nmap(target, extra_args=None, protocol="tcp"):
+    """Menjalankan Nmap sebagai proses eksternal. target = string atau list host.
+    nmap dengan -6 menolak target IPv4, jadi daftar campuran dijalankan sekali per keluarga alamat.
+    Output XML di-parse bertahap; return {host: [open ports]}"""
     extra_args = extra_args or []
-    # Default args: Ping scan (-Pn), SYN scan (-sS), Top 200 ports
-    cmd = ["nmap", "-Pn", "-sS", "--top-ports", "200"] + extra_args + [target]
+    targets = [target] if isinstance(target, str) else list(target)
+    if "-6" in extra_args:
+        return _run_nmap_pass(targets, extra_args, protocol, ipv6=False)[0]  # keluarga dipilih user sendiri
+    is_v6 = _nmap_is_ipv6(targets)
+    results = {}
+    for ipv6 in (False, True):
+        group = [t for t in targets if is_v6[t] == ipv6]
+        if not group:
+            continue
+        found, finished = _run_nmap_pass(group, extra_args, protocol, ipv6)
+        results.update(found)
+        if not finished:
+            break
+    return results
+
+def _run_nmap_pass(targets, extra_args, protocol, ipv6):
+    """Satu proses nmap untuk target satu keluarga alamat. Return ({host: [open ports]}, selesai);
+    selesai = False jika dibatalkan pengguna (pass berikutnya tidak dijalankan)"""
+    list_file = None
+    if len(targets) > 1:
+        # Daftar host panjang lewat -iL agar tidak melebihi batas panjang command line
+        list_file = tempfile.NamedTemporaryFile("w", suffix=".txt", prefix="eraldforge_targets_", delete=False)
+        list_file.write("\n".join(targets) + "\n")
+        list_file.close()
+        target_args = ["-iL", list_file.name]
+    else:
+        target_args = targets
+    # Default args: Ping scan (-Pn), SYN scan (-sS) / UDP scan (-sU), top ports, XML ke stdout.
+    # Top ports dikirim sebagai -p eksplisit dari tabel yang sama dengan engine socket.
+    scan_type = ["-sU" if protocol == "udp" else "-sS"]
+    if ipv6:
+        scan_type.append("-6")  # nmap memerlukan -6 untuk target IPv6
+    port_args = [] if "-p" in extra_args else ["-p", ",".join(map(str, top_ports(proto=protocol)))]
+    cmd = ["nmap", "-Pn"] + scan_type + port_args + extra_args + ["-oX", "-"] + target_args
     print(G + "Menjalankan nmap: " + " ".join(cmd) + W)
+    results = {}
+    finished = True
+    proc = None
     try:
-        subprocess.run(cmd)
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE)
+        for host, opens in iter_nmap_hosts(proc.stdout, protocol):
+            results[host] = opens
+            if opens:
+                print(G + f"  [OPEN] {host}: " + ", ".join(map(str, opens)) + W)
+        proc.wait()
     except KeyboardInterrupt:
         print(R + "\nDibatalkan oleh pengguna." + W)
+        finished = False
+    except ET.ParseError as e:
+        print(R + "Output XML nmap tidak valid: " + str(e) + W)
     except Exception as e:
         print(R + "Error menjalankan nmap: " + str(e) + W)
+    finally:
+        if proc and proc.poll() is None:
+            proc.terminate()
+            proc.wait()
+        if list_file:
+            try: os.unlink(list_file.name)
+            except OSError: pass
+    return results, finished
+
+# ---------------- Top ports (peringkat frekuensi) ----------------
+_port_ranking = None  # {"tcp": array('H'), "udp": array('H')}, diparse sekali
+
+def port_ranking_file():
+    """File peringkat: ERALDFORGE_TOP_PORTS_FILE > nmap-services (jika nmap terpasang) > top_ports.txt"""
+    candidates = [TOP_PORTS_FILE] if TOP_PORTS_FILE else []
+    candidates += NMAP_SERVICES_PATHS + [str(Path(__file__).resolve().with_name("top_ports.txt"))]
+    for path in candidates:
+        if path and os.path.isfile(path):
+            return path
+    return None
+
+def load_port_ranking(path):
+    """Parse file ala nmap-services ("service port/proto [freq]") -> {proto: array('H')} urut peringkat.
+    Baris tanpa frekuensi diberi peringkat menurut urutan di file."""
+    entries = {"tcp": [], "udp": []}
+    seen = {"tcp": set(), "udp": set()}
+    with open(path, encoding="utf-8", errors="replace") as f:
+        for order, line in enumerate(f):
+            fields = line.split("#", 1)[0].split()
+            if len(fields) < 2 or "/" not in fields[1]:
+                continue
+            port, _, proto = fields[1].partition("/")
+            if proto not in entries or not port.isdigit():
+                continue
+            port = int(port)
+            if not 0 < port <= 65535 or port in seen[proto]:
+                continue
+            try:
+                freq = float(fields[2]) if len(fields) > 2 else 0.0
+            except ValueError:
+                freq = 0.0
+            seen[proto].add(port)
+            entries[proto].append((-freq, order, port))
+    return {proto: array("H", (port for _, _, port in sorted(items))) for proto, items in entries.items()}
+
+def top_ports(n=None, proto="tcp"):
+    """N port paling sering terbuka (default TOP_PORT_COUNT). Dipakai engine socket/UDP dan nmap (-p)
+    sehingga semua engine memindai himpunan port yang sama."""
+    global _port_ranking
+    if _port_ranking is None:
+        path = port_ranking_file()
+        try:
+            _port_ranking = load_port_ranking(path) if path else {}
+        except OSError:
+            _port_ranking = {}
+        for key, fallback in (("tcp", TOP_PORTS), ("udp", TOP_UDP_PORTS)):
+            if not _port_ranking.get(key):
+                _port_ranking[key] = array("H", fallback)
+    ranked = _port_ranking[proto]
+    n = TOP_PORT_COUNT if n is None else n
+    return list(ranked[:max(0, n)])
+
+class RttEstimator:
+    """Estimasi RTT per host ala TCP (RFC 6298): SRTT + RTTVAR.
+    Sampel diambil dari connect yang berhasil (open) atau ditolak (closed);
+    timeout probe = SRTT + 4*RTTVAR, dibatasi MIN_TIMEOUT..MAX_TIMEOUT."""
+    ALPHA = 0.125
+    BETA = 0.25
+
+    def __init__(self, initial, adaptive=True):
+        self.initial = initial
+        self.adaptive = adaptive
+        self.srtt = None
+        self.rttvar = None
+        self.samples = 0
+        self._lock = threading.Lock()
+
+    def update(self, rtt):
+        with self._lock:
+            if self.srtt is None:
+                self.srtt, self.rttvar = rtt, rtt / 2
+            else:
+                self.rttvar = (1 - self.BETA) * self.rttvar + self.BETA * abs(self.srtt - rtt)
+                self.srtt = (1 - self.ALPHA) * self.srtt + self.ALPHA * rtt
+            self.samples += 1
+
+    def timeout(self, attempt=0):
+        """Timeout untuk probe berikutnya; attempt > 0 = retry dengan backoff 2x"""
+        if not self.adaptive:
+            return self.initial
+        if self.srtt is None:
+            base = self.initial
+        else:
+            base = min(max(self.srtt + 4 * self.rttvar, MIN_TIMEOUT), MAX_TIMEOUT)
+        return min(base * (2 ** attempt), max(MAX_TIMEOUT, self.initial))
+
+class TokenBucket:
+    """Token bucket: isi ulang `rate` token/detik sampai `burst`. Setiap probe mengambil satu token;
+    jika kosong, token "dipinjam" dan pemanggil menunggu giliran sehingga probe terdistribusi rata."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.burst = float(burst) if burst else max(1.0, self.rate / 20)
+        self.tokens = self.burst
+        self.stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """Ambil satu token. Return lama tunggu (detik) sebelum probe boleh dikirim"""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+            self.stamp = now
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+class ProbeRateLimiter:
+    """Gabungan bucket global + bucket per host (dibuat saat host pertama kali diprobe)"""
+
+    def __init__(self, rate=0, host_rate=0):
+        self.global_bucket = TokenBucket(rate) if rate > 0 else None
+        self.host_rate = host_rate
+        self.host_buckets = {}
+
+    def delay(self, host):
+        wait = self.global_bucket.reserve() if self.global_bucket else 0.0
+        if self.host_rate > 0:
+            bucket = self.host_buckets.get(host)
+            if bucket is None:
+                bucket = self.host_buckets.setdefault(host, TokenBucket(self.host_rate))
+            wait = max(wait, bucket.reserve())
+        return wait
+
+    def wait(self, host):
+        wait = self.delay(host)
+        if wait > 0:
+            time.sleep(wait)
+
+    async def wait_async(self, host):
+        wait = self.delay(host)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+def make_rate_limiter():
+    """ProbeRateLimiter sesuai PROBE_RATE/HOST_PROBE_RATE, atau None jika tanpa batas"""
+    if PROBE_RATE > 0 or HOST_PROBE_RATE > 0:
+        return ProbeRateLimiter(PROBE_RATE, HOST_PROBE_RATE)
+    return None
+
+def addr_family(addr):
+    """AF_INET6 untuk alamat IPv6 (mengandung ':'), selain itu AF_INET"""
+    return socket.AF_INET6 if ":" in addr else socket.AF_INET
+
+def _self_connected(s):
+    """TCP simultaneous open ke diri sendiri (port lokal efemeral == port tujuan, sering pada
+    scan loopback dengan banyak socket): bukan layanan yang listen, jadi bukan open."""
+    try:
+        return s.getsockname()[:2] == s.getpeername()[:2]
+    except OSError:
+        return False
+
+def socket_probe(addr, port, timeout):
+    """Connect blocking ke satu port. Return (port, state, latency)"""
+    start = time.perf_counter()
+    try:
+        with socket.socket(addr_family(addr), socket.SOCK_STREAM) as s:
+            s.settimeout(timeout)
+            s.connect((addr, int(port)))
+            state = "closed" if _self_connected(s) else "open"
+    except socket.timeout:
+        state = "filtered"
+    except ConnectionRefusedError:
+        state = "closed"
+    except OSError:
+        state = "filtered"
+    return int(port), state, time.perf_counter() - start
 
 def socket_scan_single(target, port, timeout):
     """Cek koneksi ke satu port"""
+    port, state, _latency = socket_probe(target, port, timeout)
+    return port if state == "open" else None
+
+def normalize_ports(ports):
+    """Validasi & urutkan daftar port (1-65535). Return None jika ada yang bukan angka"""
     try:
-        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-            s.settimeout(timeout)
-            s.connect((target, int(port)))
-            return int(port)
-    except Exception:
+        return sorted(set(int(p) for p in ports if 1 <= int(p) <= 65535))
+    except ValueError:
+        print(R + "Error: Ports harus berupa angka." + W)
         return None
 
-def socket_scan(target, ports, timeout, workers, verbose=False):
-    """Scan port menggunakan multithreading socket"""
-    open_ports = []
+def iter_pairs(hosts, ports, skip=None):
+    """Urutan kerja global (host, port): port demi port bergiliran antar host agar beban tersebar.
+    skip(nama, port) -> True untuk melewati pasangan yang sudah selesai (resume)"""
+    for p in ports:
+        for h in hosts:
+            if skip is None or not skip(h[0], p):
+                yield h, p
+
+def iter_retry_pairs(hosts, filtered, rtt):
+    """Pasangan (host, port) filtered untuk diulang. Host yang tidak pernah merespons
+    (tanpa sampel RTT) dilewati: kemungkinan mati/di-drop total, retry hanya buang waktu."""
+    for h in hosts:
+        if rtt[h[0]].samples:
+            for p in filtered[h[0]]:
+                yield h, p
+
+def is_ip_literal(name):
     try:
-        ports = sorted(set(int(p) for p in ports if 1 <= int(p) <= 65535))
+        ipaddress.ip_address(name.split("%", 1)[0])  # IPv6 link-local boleh membawa %scope
+        return True
     except ValueError:
-        print(R + "Error: Ports harus berupa angka." + W)
-        return []
-    
-    if not ports:
-        return open_ports
+        return False
 
-    print(C_BOX + f"Socket-scan: {len(ports)} port, timeout {timeout}s, workers {workers}" + W)
+class ResolverCache:
+    """Cache getaddrinfo bersama untuk semua target: {nama: (kedaluwarsa, [alamat])}.
+    Dual-stack (IPv4 + IPv6, urutan preferensi sistem); hasil gagal di-cache lebih singkat
+    agar daftar host besar tidak mengulang timeout DNS yang sama."""
+    NEGATIVE_TTL = 30.0
 
-    with ThreadPoolExecutor(max_workers=workers) as pool:
-        # Pastikan timeout yang digunakan adalah nilai yang di-pass, bukan default global
-        futures = {pool.submit(socket_scan_single, target, p, timeout): p for p in ports}
-        
-        for fut in as_completed(futures):
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def _lookup(self, name):
+        family = {"4": socket.AF_INET, "6": socket.AF_INET6}.get(ADDRESS_FAMILY, socket.AF_UNSPEC)
+        infos = socket.getaddrinfo(name, None, family, socket.SOCK_STREAM, 0, socket.AI_ADDRCONFIG)
+        return list(dict.fromkeys(info[4][0] for info in infos))
+
+    def _fresh(self, name, now):
+        hit = self._cache.get(name)
+        return hit[1] if hit and hit[0] > now else None
+
+    def get(self, name):
+        """Daftar alamat untuk nama (kosong jika gagal); IP literal dikembalikan tanpa lookup"""
+        if is_ip_literal(name):
+            return [name]
+        now = time.monotonic()
+        with self._lock:
+            addrs = self._fresh(name, now)
+        if addrs is not None:
+            return addrs
+        try:
+            addrs, ttl = self._lookup(name), self.ttl
+        except (socket.gaierror, UnicodeError, OSError):
+            addrs, ttl = [], min(self.ttl, self.NEGATIVE_TTL)
+        with self._lock:
+            self._cache[name] = (now + ttl, addrs)
+        return addrs
+
+    def resolve_many(self, names):
+        """Resolve banyak nama sekaligus; lookup yang belum ada di cache dijalankan paralel"""
+        names = list(dict.fromkeys(names))
+        now = time.monotonic()
+        with self._lock:
+            todo = [n for n in names if not is_ip_literal(n) and self._fresh(n, now) is None]
+        if len(todo) > 1:
+            with ThreadPoolExecutor(max_workers=min(RESOLVE_WORKERS, len(todo))) as pool:
+                list(pool.map(self.get, todo))
+        return {n: self.get(n) for n in names}
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+_resolver = ResolverCache(RESOLVE_TTL)
+
+def resolve_hosts(names):
+    """Resolve daftar nama host sekali di awal (paralel, lewat cache bersama).
+    Return list (nama, ip) dengan alamat pertama pilihan getaddrinfo (IPv4 atau IPv6);
+    host gagal resolve dilewati dengan pesan di stderr."""
+    resolved = _resolver.resolve_many(names)
+    out = []
+    for name in names:
+        addrs = resolved[name]
+        if addrs:
+            out.append((name, addrs[0]))
+        else:
+            print(R + f"Error: Host '{name}' tidak dapat di-resolve." + W, file=sys.stderr)
+    return out
+
+# Satu hasil probe final: state = open / closed / filtered, latency dalam detik (None jika tidak diukur)
+PortResult = namedtuple("PortResult", "host port state latency")
+
+class _SweepState:
+    """Estimator RTT & antrean retry bersama untuk satu sweep (dipakai kedua engine)"""
+    def __init__(self, hosts, timeout):
+        self.rtt = {name: RttEstimator(timeout, ADAPTIVE_TIMEOUT) for name, _ in hosts}
+        self.filtered = {name: array("H") for name, _ in hosts}
+
+    def record(self, name, port, state, latency, final):
+        """Catat hasil probe. Return PortResult jika hasil sudah final, None jika masuk antrean retry"""
+        if state == "filtered":
+            if not final:
+                self.filtered[name].append(port)
+                return None
+        else:
+            self.rtt[name].update(latency)
+        return PortResult(name, port, state, latency)
+
+    def take_filtered(self):
+        """Ambil daftar port filtered saat ini dan mulai daftar baru untuk pass berikutnya"""
+        filtered, self.filtered = self.filtered, {name: array("H") for name in self.filtered}
+        return filtered
+
+    def unretried(self, filtered):
+        """Port filtered milik host tanpa sampel RTT: tidak diulang, langsung final"""
+        for name, ports in filtered.items():
+            if not self.rtt[name].samples:
+                for p in ports:
+                    yield PortResult(name, p, "filtered", None)
+
+def iter_socket_scan(hosts, ports, timeout, workers, per_host=None, skip=None):
+    """Generator engine thread: yield PortResult segera setelah diketahui.
+    hosts = [(nama, ip)], ports sudah dinormalisasi, skip = lihat iter_pairs."""
+    per_host = max(1, min(per_host or workers, workers))
+    host_slots = {name: threading.BoundedSemaphore(per_host) for name, _ in hosts}
+    sweep = _SweepState(hosts, timeout)
+
+    limiter = make_rate_limiter()
+
+    def probe(name, addr, port, attempt):
+        if limiter:
+            limiter.wait(name)
+        with host_slots[name]:
+            return (name,) + socket_probe(addr, port, sweep.rtt[name].timeout(attempt))
+
+    def emit(done, final):
+        for fut in done:
             try:
-                res = fut.result()
-                if res:
-                    open_ports.append(res)
-                    if verbose:
-                        print(G + f"  [OPEN] {res}" + W)
+                res = sweep.record(*fut.result(), final)
             except Exception:
+                continue
+            if res:
+                yield res
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pairs = iter_pairs(hosts, ports, skip)
+        for attempt in range(SCAN_RETRIES + 1):
+            final = attempt == SCAN_RETRIES
+            # Jendela submit dibatasi agar sweep besar tidak membuat jutaan future sekaligus
+            inflight = set()
+            for (name, addr), p in pairs:
+                inflight.add(pool.submit(probe, name, addr, p, attempt))
+                if len(inflight) >= workers * 4:
+                    done, inflight = wait(inflight, return_when=FIRST_COMPLETED)
+                    yield from emit(done, final)
+            yield from emit(as_completed(inflight), final)
+            if not final:
+                filtered = sweep.take_filtered()
+                yield from sweep.unretried(filtered)
+                pairs = iter_retry_pairs(hosts, filtered, sweep.rtt)
+
+def _collect(results, hosts, verbose, checkpoint=None):
+    """Kumpulkan hanya port open dari stream PortResult. Return {host: [open ports]}.
+    Jika ada checkpoint, setiap hasil final dicatat dan port open dari run sebelumnya digabung."""
+    opens = {name: list(checkpoint.opens.get(name, ())) if checkpoint else [] for name, _ in hosts}
+    for res in results:
+        if checkpoint:
+            checkpoint.mark(res)
+        if res.state == "open":
+            opens[res.host].append(res.port)
+            if verbose:
+                print(G + f"  [OPEN] {res.host}:{res.port}" + W)
+    return {name: sorted(v) for name, v in opens.items()}
+
+def socket_scan_hosts(hosts, ports, timeout, workers, per_host=None, verbose=False, checkpoint=None):
+    """Scan banyak host dengan satu ThreadPoolExecutor bersama. Return {host: [open ports]}"""
+    ports = normalize_ports(ports)
+    if not ports or not hosts:
+        return {name: [] for name, _ in hosts}
+    print(C_BOX + f"Socket-scan: {len(hosts)} host x {len(ports)} port, timeout {_timeout_label(timeout)}, workers {workers}" + W)
+    skip = checkpoint.is_done if checkpoint else None
+    return _collect(iter_socket_scan(hosts, ports, timeout, workers, per_host, skip), hosts, verbose, checkpoint)
+
+def socket_scan(target, ports, timeout, workers, verbose=False):
+    """Scan port menggunakan multithreading socket"""
+    hosts = resolve_hosts([target])
+    if not hosts:
+        return []
+    return socket_scan_hosts(hosts, ports, timeout, workers, verbose=verbose)[target]
+
+def _timeout_label(timeout):
+    label = f"adaptif (awal {timeout}s, retry {SCAN_RETRIES}x)" if ADAPTIVE_TIMEOUT else f"{timeout}s"
+    if PROBE_RATE > 0 or HOST_PROBE_RATE > 0:
+        label += f", rate {PROBE_RATE or '-'}/s global, {HOST_PROBE_RATE or '-'}/s per host"
+    return label
+
+# ---------------- Asyncio engine ----------------
+def fd_budget(requested, reserve=64):
+    """Batasi jumlah socket paralel agar tidak melebihi limit file descriptor (RLIMIT_NOFILE)"""
+    try:
+        import resource
+        soft, _hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if soft != resource.RLIM_INFINITY:
+            return max(1, min(requested, soft - reserve))
+    except Exception:
+        pass
+    return max(1, requested)
+
+async def async_probe(loop, addr, port, timeout):
+    """Connect non-blocking ke satu port. Return (port, state, latency)"""
+    s = socket.socket(addr_family(addr), socket.SOCK_STREAM)
+    s.setblocking(False)
+    start = time.perf_counter()
+    try:
+        await asyncio.wait_for(loop.sock_connect(s, (addr, port)), timeout)
+        state = "closed" if _self_connected(s) else "open"
+    except asyncio.TimeoutError:
+        state = "filtered"
+    except ConnectionRefusedError:
+        state = "closed"
+    except OSError:
+        # Host/network unreachable dll: anggap tidak terjangkau (filtered)
+        state = "filtered"
+    finally:
+        s.close()
+    return port, state, time.perf_counter() - start
+
+async def aiter_async_scan(hosts, ports, timeout, concurrency, per_host=None, skip=None):
+    """Async generator engine asyncio: yield PortResult segera setelah diketahui.
+    Antrean hasil dibatasi sehingga worker berhenti sejenak bila konsumen lambat."""
+    loop = asyncio.get_running_loop()
+    per_host = max(1, min(per_host or concurrency, concurrency))
+    host_slots = {name: asyncio.Semaphore(per_host) for name, _ in hosts}
+    sweep = _SweepState(hosts, timeout)
+    limiter = make_rate_limiter()
+    queue = asyncio.Queue(maxsize=concurrency * 2)
+    done_marker = object()
+
+    async def run_pass(pairs, attempt):
+        # Satu scheduler global: iterator (host, port) dibagi ke semua worker,
+        # jumlah coroutine = batas in-flight global, semaphore per host = batas per host
+        final = attempt == SCAN_RETRIES
+        async def worker():
+            for (name, addr), p in pairs:
+                if limiter:
+                    await limiter.wait_async(name)
+                async with host_slots[name]:
+                    res = await async_probe(loop, addr, p, sweep.rtt[name].timeout(attempt))
+                res = sweep.record(name, *res, final)
+                if res:
+                    await queue.put(res)
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+    async def producer():
+        cancelled = False
+        try:
+            await run_pass(iter_pairs(hosts, ports, skip), 0)
+            for attempt in range(1, SCAN_RETRIES + 1):
+                filtered = sweep.take_filtered()
+                for res in sweep.unretried(filtered):
+                    await queue.put(res)
+                await run_pass(iter_retry_pairs(hosts, filtered, sweep.rtt), attempt)
+        except asyncio.CancelledError:
+            # Dibatalkan oleh konsumen: jangan menunggu antrean yang tidak lagi dibaca
+            cancelled = True
+            raise
+        finally:
+            if not cancelled:
+                await queue.put(done_marker)
+
+    task = asyncio.ensure_future(producer())
+    try:
+        while True:
+            res = await queue.get()
+            if res is done_marker:
+                break
+            yield res
+        await task  # teruskan exception dari worker (jika ada)
+    finally:
+        if not task.done():
+            task.cancel()
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
                 pass
-                
-    return sorted(open_ports)
 
-def log_scan(target, ports, mode="socket"):
-    """Menyimpan hasil scan ke file log"""
+def iter_async_gen(agen):
+    """Jalankan async generator di event loop privat dan jadikan generator biasa"""
+    loop = asyncio.new_event_loop()
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(agen.__anext__())
+            except StopAsyncIteration:
+                break
+    finally:
+        # Ctrl-C bisa memotong loop di tengah probe: batalkan semua task sebelum menutup loop
+        pending = asyncio.all_tasks(loop)
+        for task in pending:
+            task.cancel()
+        if pending:
+            loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+        try:
+            loop.run_until_complete(agen.aclose())
+        except RuntimeError:
+            pass
+        loop.close()
+
+def async_scan_hosts(hosts, ports, timeout, concurrency, per_host=None, verbose=False, checkpoint=None):
+    """Scan banyak host dengan asyncio dalam satu pass. hosts = [(nama, ip)]. Return {host: [open ports]}"""
+    ports = normalize_ports(ports)
+    if not ports or not hosts:
+        return {name: [] for name, _ in hosts}
+
+    concurrency = min(fd_budget(concurrency), len(hosts) * len(ports))
+    per_host = max(1, min(per_host or concurrency, concurrency))
+    print(C_BOX + f"Async-scan: {len(hosts)} host x {len(ports)} port, timeout {_timeout_label(timeout)}, concurrency {concurrency} (per host {per_host})" + W)
+    skip = checkpoint.is_done if checkpoint else None
+    results = iter_async_gen(aiter_async_scan(hosts, ports, timeout, concurrency, per_host, skip))
+    return _collect(results, hosts, verbose, checkpoint)
+
+# ---------------- Shard engine (multiprocessing) ----------------
+SHARD_MIN_PAIRS = 2048   # shard lebih kecil tidak sebanding dengan biaya start proses
+SHARD_BATCH = 256        # hasil dikirim ke merger per batch agar overhead pipe kecil
+SHARD_FLUSH = 0.5        # ...atau paling lama setiap N detik, agar progres/checkpoint tetap maju pada scan lambat
+SHARD_RETRIES = 1        # shard yang workernya mati dijadwalkan ulang sekali; selebihnya dilaporkan sebagai error
+
+def raise_fd_limit():
+    """Naikkan soft RLIMIT_NOFILE sampai hard limit (diwarisi proses worker). Return soft limit"""
     try:
-        with open(SCAN_LOG, "a") as f:
-            f.write(f"[{datetime.now().isoformat()}] mode={mode} target={target} open={ports}\n")
+        import resource
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if hard == resource.RLIM_INFINITY or hard > soft:
+            target = 65536 if hard == resource.RLIM_INFINITY else hard
+            resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+            soft = target
+        return soft
     except Exception:
+        return None
+
+def plan_shards(hosts, ports, processes):
+    """Bagi ruang (host, port) menjadi shard. Host dibagi per kelompok bila jumlahnya cukup
+    (RTT & batas per host tetap di satu proses); jika tidak, port yang dibagi.
+    Return (jumlah proses, [(hosts, ports)], concurrency per proses, batas per host)."""
+    total = len(hosts) * len(ports)
+    processes = max(1, min(processes, -(-total // SHARD_MIN_PAIRS)))
+    # Budget fd dicek dulu: tiap proses boleh memakai sebanyak itu socket sekaligus
+    per_proc = min(fd_budget(MAX_CONCURRENCY), -(-total // processes))
+    # ±4 shard per proses untuk load balancing, tapi cukup besar untuk mengisi budget fd worker
+    shard_pairs = max(per_proc * 4, SHARD_MIN_PAIRS, -(-total // (processes * 4)))
+    per_host = MAX_HOST_CONCURRENCY
+    shards = []
+    if len(hosts) >= processes:
+        size = max(1, min(shard_pairs // len(ports), -(-len(hosts) // processes)))
+        for i in range(0, len(hosts), size):
+            shards.append((hosts[i:i + size], ports))
+    else:
+        size = max(1, min(shard_pairs // len(hosts), -(-len(ports) // processes)))
+        for i in range(0, len(ports), size):
+            shards.append((hosts, ports[i:i + size]))
+        # Host yang sama dipindai beberapa proses sekaligus: bagi batas per host
+        per_host = max(1, per_host // min(processes, len(shards)))
+    return processes, shards, per_proc, per_host
+
+def _shard_worker(tasks, conn, settings):
+    """Proses worker: satu event loop untuk semua shard yang diambil dari antrean.
+    Pesan ke merger lewat pipe: ("start", idx), ("res", idx, [..]), ("done", idx), ("error", teks), ("exit",)"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl-C ditangani proses induk
+    globals().update(settings)
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+
+    async def run(idx, hosts, ports, done):
+        skip = (lambda name, p: p in done.get(name, ())) if done else None
+        concurrency = min(MAX_CONCURRENCY, len(hosts) * len(ports))
+        batch, last = [], time.monotonic()
+        async for res in aiter_async_scan(hosts, ports, DEFAULT_TIMEOUT, concurrency, MAX_HOST_CONCURRENCY, skip):
+            batch.append(tuple(res))
+            if len(batch) >= SHARD_BATCH or time.monotonic() - last >= SHARD_FLUSH:
+                conn.send(("res", idx, batch))
+                batch, last = [], time.monotonic()
+        if batch:
+            conn.send(("res", idx, batch))
+
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            idx, hosts, ports, done = task
+            conn.send(("start", idx))
+            loop.run_until_complete(run(idx, hosts, ports, done))
+            conn.send(("done", idx))
+    except Exception as e:
+        conn.send(("error", f"{type(e).__name__}: {e}"))
+    finally:
+        try:
+            conn.send(("exit",))
+        except OSError:
+            pass
+        conn.close()
+        loop.close()
+
+def iter_sharded_scan(hosts, ports, processes=None, checkpoint=None, plan=None):
+    """Scan (host, port) di beberapa proses. Merger meng-yield PortResult per batch segera setelah
+    diterima (di dalam batch urut (host, port)), sehingga checkpoint maju selama shard berjalan.
+    Shard yang workernya mati dijadwalkan ulang (SHARD_RETRIES) untuk pasangan yang belum diterima;
+    jika tetap gagal, pasangan tersisa di-yield dengan state "error" (tidak dicatat checkpoint)."""
+    ports = normalize_ports(ports)
+    if not ports or not hosts:
+        return
+    if plan is None:
+        raise_fd_limit()
+        plan = plan_shards(hosts, ports, processes or SCAN_PROCESSES or os.cpu_count() or 1)
+    processes, shards, per_proc, per_host = plan
+    split_ports = len(shards) > 1 and shards[0][0] is shards[1][0]
+    settings = {
+        "DEFAULT_TIMEOUT": DEFAULT_TIMEOUT, "SCAN_RETRIES": SCAN_RETRIES, "ADAPTIVE_TIMEOUT": ADAPTIVE_TIMEOUT,
+        "MIN_TIMEOUT": MIN_TIMEOUT, "MAX_TIMEOUT": MAX_TIMEOUT,
+        "MAX_CONCURRENCY": per_proc, "MAX_HOST_CONCURRENCY": per_host,
+        # Batas rate dibagi rata ke semua proses
+        "PROBE_RATE": PROBE_RATE / processes,
+        "HOST_PROBE_RATE": HOST_PROBE_RATE / processes if split_ports else HOST_PROBE_RATE,
+    }
+    methods = multiprocessing.get_all_start_methods()
+    ctx = multiprocessing.get_context("fork" if "fork" in methods else "spawn")
+    tasks = ctx.Queue()
+    received = {}   # idx -> {host: {port}} yang sudah diterima dari shard yang belum selesai
+    attempts = {}
+    outstanding = set(range(len(shards)))
+    failed = []
+
+    def submit(idx):
+        shard_hosts, shard_ports = shards[idx]
+        got = received.get(idx, {})
+        done = {name: set(got.get(name, ())) for name, _ in shard_hosts}
+        if checkpoint:
+            for name, _ in shard_hosts:
+                done[name].update(p for p in shard_ports if checkpoint.is_done(name, p))
+        tasks.put((idx, shard_hosts, shard_ports, done if any(done.values()) else None))
+        attempts[idx] = attempts.get(idx, 0) + 1
+
+    workers = {}  # conn -> [proses, shard yang sedang dikerjakan]
+
+    def spawn():
+        recv, send = ctx.Pipe(duplex=False)
+        proc = ctx.Process(target=_shard_worker, args=(tasks, send, settings), daemon=True)
+        proc.start()
+        send.close()
+        workers[recv] = [proc, None]
+
+    for idx in range(len(shards)):
+        submit(idx)
+    for _ in range(processes):
+        spawn()
+    spawn_budget = processes  # pengganti worker yang mati
+    stopping = False
+    order = {name: i for i, (name, _) in enumerate(hosts)}
+
+    try:
+        while workers:
+            if not outstanding and not stopping:
+                for _ in workers:
+                    tasks.put(None)
+                stopping = True
+            for conn in multiprocessing.connection.wait(list(workers)):
+                try:
+                    msg = conn.recv()
+                except (EOFError, OSError):
+                    msg = ("exit",)
+                kind = msg[0]
+                if kind == "start":
+                    workers[conn][1] = msg[1]
+                elif kind == "res":
+                    got = received.setdefault(msg[1], {})
+                    rows = sorted(msg[2], key=lambda r: (order[r[0]], r[1]))
+                    for row in rows:
+                        got.setdefault(row[0], set()).add(row[1])
+                        yield PortResult(*row)
+                elif kind == "done":
+                    outstanding.discard(msg[1])
+                    received.pop(msg[1], None)
+                    workers[conn][1] = None
+                elif kind == "error":
+                    print(R + f"Worker shard gagal: {msg[1]}" + W, file=sys.stderr)
+                else:
+                    proc, current = workers.pop(conn)
+                    conn.close()
+                    # Reap segera: tanpa join, CPU worker belum masuk RUSAGE_CHILDREN (bench) dan proses jadi zombie
+                    proc.join(timeout=1)
+                    if proc.is_alive():
+                        proc.terminate()
+                        proc.join(timeout=1)
+                    if current in outstanding:
+                        # Worker mati di tengah shard: jadwalkan ulang sisa pasangan, atau menyerah
+                        if attempts[current] <= SHARD_RETRIES:
+                            submit(current)
+                        else:
+                            outstanding.discard(current)
+                            failed.append(current)
+                    if outstanding and (current is not None or not workers) and spawn_budget > 0:
+                        spawn()
+                        spawn_budget -= 1
+        failed.extend(sorted(outstanding))  # tidak ada worker tersisa untuk shard ini
+        if failed:
+            missing = 0
+            for idx in failed:
+                got = received.get(idx, {})
+                shard_hosts, shard_ports = shards[idx]
+                for name, _ in shard_hosts:
+                    for p in shard_ports:
+                        if p not in got.get(name, ()) and not (checkpoint and checkpoint.is_done(name, p)):
+                            missing += 1
+                            yield PortResult(name, p, "error", None)
+            print(R + f"{len(failed)} shard gagal, {missing} probe tidak dipindai (state 'error')." + W, file=sys.stderr)
+    finally:
+        for proc, _current in workers.values():
+            if proc.is_alive():
+                proc.terminate()
+            proc.join(timeout=1)
+        for conn in workers:
+            conn.close()
+        tasks.close()
+        tasks.cancel_join_thread()
+
+def shard_scan_hosts(hosts, ports, processes=None, verbose=False, checkpoint=None):
+    """Engine shard: multiprocessing + event loop per proses. Return {host: [open ports]}"""
+    ports = normalize_ports(ports)
+    if not ports or not hosts:
+        return {name: [] for name, _ in hosts}
+    fd_limit = raise_fd_limit()
+    plan = plan_shards(hosts, ports, processes or SCAN_PROCESSES or os.cpu_count() or 1)
+    print(C_BOX + f"Shard-scan: {len(hosts)} host x {len(ports)} port, {plan[0]} proses x concurrency {plan[2]} "
+          f"(fd limit {fd_limit or '?'}), {len(plan[1])} shard, timeout {_timeout_label(DEFAULT_TIMEOUT)}" + W)
+    return _collect(iter_sharded_scan(hosts, ports, checkpoint=checkpoint, plan=plan), hosts, verbose, checkpoint)
+
+def scan_hosts(targets, ports, engine=None, verbose=False, checkpoint=None):
+    """Pilih engine socket (async / thread) dan scan semua target. Return {host: [open ports]}.
+    Untuk banyak host, host discovery dijalankan dulu (lihat discover_hosts)."""
+    engine = (engine or SCAN_ENGINE).lower()
+    hosts = resolve_hosts(targets)
+    if HOST_DISCOVERY and len(hosts) > 1:
+        hosts = discover_hosts(hosts)
+    if checkpoint:
+        checkpoint.retain(name for name, _ in hosts)
+    if engine == "thread":
+        return socket_scan_hosts(hosts, ports, timeout=DEFAULT_TIMEOUT, workers=MAX_WORKERS,
+                                 per_host=MAX_HOST_CONCURRENCY, verbose=verbose, checkpoint=checkpoint)
+    if engine == "shard":
+        return shard_scan_hosts(hosts, ports, verbose=verbose, checkpoint=checkpoint)
+    return async_scan_hosts(hosts, ports, timeout=DEFAULT_TIMEOUT, concurrency=MAX_CONCURRENCY,
+                            per_host=MAX_HOST_CONCURRENCY, verbose=verbose, checkpoint=checkpoint)
+
+def iter_scan(targets, ports, engine=None):
+    """API streaming: yield PortResult(host, port, state, latency) untuk setiap (host, port)
+    segera setelah hasilnya final. Memori tetap kecil: tidak ada daftar hasil yang ditampung."""
+    engine = (engine or SCAN_ENGINE).lower()
+    hosts = resolve_hosts(targets)
+    ports = normalize_ports(ports)
+    if HOST_DISCOVERY and len(hosts) > 1:
+        hosts = discover_hosts(hosts)
+    if not ports or not hosts:
+        return
+    if SCAN_PROTO == "udp":
+        yield from iter_udp_scan(hosts, ports)
+    elif engine == "thread":
+        yield from iter_socket_scan(hosts, ports, DEFAULT_TIMEOUT, MAX_WORKERS, MAX_HOST_CONCURRENCY)
+    elif engine == "shard":
+        yield from iter_sharded_scan(hosts, ports)
+    else:
+        concurrency = min(fd_budget(MAX_CONCURRENCY), len(hosts) * len(ports))
+        yield from iter_async_gen(aiter_async_scan(hosts, ports, DEFAULT_TIMEOUT, concurrency, MAX_HOST_CONCURRENCY))
+
+def result_record(res, info=None):
+    """PortResult (+ ServiceInfo opsional) -> dict untuk output JSON/CSV"""
+    latency = round(res.latency * 1000, 3) if res.latency is not None else None
+    rec = {"host": res.host, "port": res.port, "proto": SCAN_PROTO, "state": res.state, "latency_ms": latency}
+    if info is not None:
+        rec.update(service=info.service, version=info.version, banner=info.banner)
+    return rec
+
+# ---------------- Host discovery ----------------
+def read_arp_table(path="/proc/net/arp"):
+    """IP yang punya entri ARP/neighbour lengkap (flag ATF_COM) di /proc/net/arp"""
+    alive = set()
+    try:
+        with open(path) as f:
+            next(f, None)
+            for line in f:
+                cols = line.split()
+                if len(cols) >= 4 and int(cols[2], 16) & 0x2 and cols[3] != "00:00:00:00:00:00":
+                    alive.add(cols[0])
+    except (OSError, ValueError):
+        pass  # Android 10+ menolak akses /proc/net/arp
+    return alive
+
+def local_networks(path="/proc/net/route"):
+    """Subnet IPv4 yang terhubung langsung (gateway 0.0.0.0) dari /proc/net/route"""
+    nets = []
+    try:
+        with open(path) as f:
+            next(f, None)
+            for line in f:
+                cols = line.split()
+                if len(cols) < 8 or int(cols[2], 16) != 0:
+                    continue
+                dest = ipaddress.IPv4Address(struct.pack("<I", int(cols[1], 16)))
+                mask = ipaddress.IPv4Address(struct.pack("<I", int(cols[7], 16)))
+                if int(mask):
+                    nets.append(ipaddress.IPv4Network(f"{dest}/{mask}", strict=False))
+    except (OSError, ValueError):
+        pass
+    return nets
+
+async def _discover_tcp(hosts, ports, timeout, concurrency, limiter=None):
+    loop = asyncio.get_running_loop()
+    alive = set()
+    # Host yang sudah terbukti hidup dilewati untuk port berikutnya
+    pending = iter_pairs(hosts, ports, skip=lambda name, _p: name in alive)
+
+    async def worker():
+        for (name, addr), p in pending:
+            if limiter:
+                await limiter.wait_async(name)
+            if name in alive:
+                continue  # sudah terbukti hidup selama menunggu token
+            _port, state, _latency = await async_probe(loop, addr, p, timeout)
+            if state != "filtered":  # open maupun RST (closed) = host hidup
+                alive.add(name)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return alive
+
+def discover_hosts(hosts, ports=None, timeout=None):
+    """Pre-pass liveness: connect TCP paralel ke beberapa port umum + tabel ARP untuk subnet lokal.
+    hosts = [(nama, ip)]. Return host yang hidup (urutan dipertahankan)."""
+    start = time.time()
+    ports = ports or DISCOVERY_PORTS
+    timeout = timeout or DISCOVERY_TIMEOUT
+    concurrency = min(fd_budget(MAX_CONCURRENCY), len(hosts) * len(ports))
+    # Probe discovery ikut --rate/--host-rate agar sweep terbatas tidak diawali ledakan probe
+    alive = asyncio.run(_discover_tcp(hosts, ports, timeout, concurrency, make_rate_limiter()))
+    # Connect ke host di subnet lokal memicu ARP; host yang menjawab ARP tetap hidup meski port di-drop
+    nets = local_networks()
+    if nets:
+        arp = read_arp_table()
+        for name, addr in hosts:
+            if name not in alive and addr in arp:
+                try:
+                    ip = ipaddress.ip_address(addr)
+                except ValueError:
+                    continue
+                if any(ip in net for net in nets if net.version == ip.version):
+                    alive.add(name)
+    live = [h for h in hosts if h[0] in alive]
+    print(C_BOX + f"Host discovery: {len(live)}/{len(hosts)} host hidup ({time.time()-start:.1f}s)" + W)
+    return live
+
+# ---------------- UDP engine ----------------
+def _dns_query(name=b"\x00", qtype=1):
+    return b"\x13\x37\x01\x00\x00\x01\x00\x00\x00\x00\x00\x00" + name + struct.pack(">HH", qtype, 1)
+
+# Payload spesifik protokol (layanan UDP umumnya diam terhadap datagram kosong)
+UDP_PAYLOADS = {
+    53: _dns_query(),
+    5353: _dns_query(b"\x09_services\x07_dns-sd\x04_udp\x05local\x00", 12),
+    69: b"\x00\x01eraldforge\x00octet\x00",
+    123: b"\x1b" + b"\x00" * 47,
+    137: b"\x13\x37\x00\x00\x00\x01\x00\x00\x00\x00\x00\x00\x20CKAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA\x00\x00\x21\x00\x01",
+    161: bytes.fromhex("302602010004067075626c6963a019020413370001020100020100300b300906052b060102010500"),
+    1900: b"M-SEARCH * HTTP/1.1\r\nHOST: 239.255.255.250:1900\r\nMAN: \"ssdp:discover\"\r\nMX: 1\r\nST: ssdp:all\r\n\r\n",
+    5060: b"OPTIONS sip:nm SIP/2.0\r\nVia: SIP/2.0/UDP nm;branch=z9hG4bK1337\r\nFrom: <sip:nm@nm>;tag=1337\r\nTo: <sip:nm2@nm2>\r\nCall-ID: 1337@nm\r\nCSeq: 42 OPTIONS\r\nMax-Forwards: 70\r\nContent-Length: 0\r\n\r\n",
+    11211: b"\x00\x01\x00\x00\x00\x01\x00\x00stats\r\n",
+}
+_SO_EE_ORIGIN_ICMP = 2
+_SO_EE_ORIGIN_ICMP6 = 3
+_IP_RECVERR = getattr(socket, "IP_RECVERR", 11)
+_IPV6_RECVERR = getattr(socket, "IPV6_RECVERR", 25)
+
+def iter_udp_scan(hosts, ports, timeout=None, retries=None, window=None, sockets=None):
+    """Generator scan UDP: yield PortResult dengan state open / open|filtered / closed / filtered.
+    Probe dikirim dari pool kecil socket (bukan satu socket per port); satu loop selectors
+    mencocokkan jawaban dengan probe berdasarkan alamat & port sumber. Port unreachable (ICMP)
+    dibaca dari error queue socket (IP_RECVERR, Linux) tanpa raw socket. Tanpa jawaban
+    setelah semua retry = open|filtered."""
+    timeout = timeout or UDP_TIMEOUT
+    retries = UDP_RETRIES if retries is None else retries
+    window = fd_budget(window or UDP_WINDOW)
+    names = {addr: name for name, addr in hosts}
+    limiter = make_rate_limiter()
+    sel = selectors.DefaultSelector()
+    pools = {}  # family -> [socket]; IPv6 hanya dibuat bila ada target IPv6
+    for family in dict.fromkeys(addr_family(addr) for _, addr in hosts):
+        pools[family] = []
+        for _ in range(max(1, sockets or UDP_SOCKETS)):
+            sock = socket.socket(family, socket.SOCK_DGRAM)
+            sock.setblocking(False)
+            if sys.platform.startswith("linux"):
+                try:
+                    if family == socket.AF_INET6:
+                        sock.setsockopt(socket.IPPROTO_IPV6, _IPV6_RECVERR, 1)
+                    else:
+                        sock.setsockopt(socket.SOL_IP, _IP_RECVERR, 1)
+                except OSError:
+                    pass
+            sel.register(sock, selectors.EVENT_READ)
+            pools[family].append(sock)
+
+    outstanding = {}   # (addr, port) -> [tries, deadline, sent_at]
+    deadlines = []     # heap (deadline, addr, port); entri basi dilewati
+    finished = []
+    pairs = iter_pairs(hosts, ports)
+    counter = 0
+
+    def resolve(key, state, latency=None):
+        if outstanding.pop(key, None) is not None:
+            finished.append(PortResult(names[key[0]], key[1], state, latency))
+
+    def drain_errors(sock):
+        # ICMP error untuk datagram yang dikirim socket ini: alamat = tujuan probe asli
+        while True:
+            try:
+                _data, ancdata, _flags, addr = sock.recvmsg(512, 512, socket.MSG_ERRQUEUE)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                return
+            for _level, _type, blob in ancdata:
+                if len(blob) < 16:
+                    continue
+                _errno, origin, icmp_type, icmp_code, _pad, _info, _d = struct.unpack("=IBBBBII", blob[:16])
+                # Destination unreachable: ICMP type 3 / ICMPv6 type 1
+                v4 = origin == _SO_EE_ORIGIN_ICMP and icmp_type == 3
+                v6 = origin == _SO_EE_ORIGIN_ICMP6 and icmp_type == 1
+                if (v4 or v6) and addr:
+                    key = (addr[0], addr[1])
+                    entry = outstanding.get(key)
+                    latency = time.monotonic() - entry[2] if entry else None
+                    # Port unreachable (code 3 / ICMPv6 code 4) -> closed; lainnya (admin prohibited dll) -> filtered
+                    unreachable = icmp_code == (3 if v4 else 4)
+                    resolve(key, "closed" if unreachable else "filtered", latency)
+
+    def send(key, entry):
+        nonlocal counter
+        pool = pools[addr_family(key[0])]
+        sock = pool[counter % len(pool)]
+        counter += 1
+        payload = UDP_PAYLOADS.get(key[1], b"")
+        for _ in range(2):
+            try:
+                sock.sendto(payload, key)
+                break
+            except (ConnectionRefusedError, ConnectionResetError):
+                # Error ICMP tertunda dilaporkan saat sendto: baca dulu lalu kirim ulang
+                drain_errors(sock)
+            except BlockingIOError:
+                break
+            except OSError:
+                resolve(key, "filtered")
+                return
+        now = time.monotonic()
+        entry[0] += 1
+        entry[1] = now + timeout
+        entry[2] = now
+        heapq.heappush(deadlines, (entry[1], key))
+
+    try:
+        while True:
+            while len(outstanding) < window:
+                pair = next(pairs, None)
+                if pair is None:
+                    break
+                (name, addr), port = pair
+                key = (addr, port)
+                if limiter:
+                    limiter.wait(name)
+                outstanding[key] = entry = [0, 0.0, 0.0]
+                send(key, entry)
+            if not outstanding:
+                break
+
+            wait = max(0.0, deadlines[0][0] - time.monotonic()) if deadlines else timeout
+            for sel_key, _mask in sel.select(wait):
+                sock = sel_key.fileobj
+                drain_errors(sock)
+                while True:
+                    try:
+                        _data, src = sock.recvfrom(4096)
+                    except (BlockingIOError, InterruptedError):
+                        break
+                    except OSError:
+                        drain_errors(sock)
+                        continue
+                    key = (src[0], src[1])
+                    entry = outstanding.get(key)
+                    if entry:
+                        resolve(key, "open", time.monotonic() - entry[2])
+
+            now = time.monotonic()
+            while deadlines and deadlines[0][0] <= now:
+                deadline, key = heapq.heappop(deadlines)
+                entry = outstanding.get(key)
+                if entry is None or entry[1] != deadline:
+                    continue
+                if entry[0] <= retries:
+                    if limiter:
+                        limiter.wait(names[key[0]])
+                    send(key, entry)
+                else:
+                    resolve(key, "open|filtered")
+
+            yield from finished
+            finished.clear()
+    finally:
+        for pool in pools.values():
+            for sock in pool:
+                sel.unregister(sock)
+                sock.close()
+        sel.close()
+    yield from finished
+
+def udp_scan_hosts(hosts, ports, verbose=False):
+    """Scan UDP banyak host. Return ({host: [open ports]}, {host: jumlah open|filtered})"""
+    ports = normalize_ports(ports)
+    opens = {name: [] for name, _ in hosts}
+    maybe = {name: 0 for name, _ in hosts}
+    if not ports or not hosts:
+        return opens, maybe
+    print(C_BOX + f"UDP-scan: {len(hosts)} host x {len(ports)} port, timeout {UDP_TIMEOUT}s, retry {UDP_RETRIES}x, {UDP_SOCKETS} socket" + W)
+    for res in iter_udp_scan(hosts, ports):
+        if res.state == "open":
+            opens[res.host].append(res.port)
+            if verbose:
+                print(G + f"  [OPEN] {res.host}:{res.port}/udp" + W)
+        elif res.state == "open|filtered":
+            maybe[res.host] += 1
+    return {name: sorted(v) for name, v in opens.items()}, maybe
+
+# ---------------- Banner grabbing / service fingerprint ----------------
+ServiceInfo = namedtuple("ServiceInfo", "service version banner")
+
+# Probe yang dikirim jika layanan tidak menyapa duluan (port -> payload)
+HTTP_PROBE = b"HEAD / HTTP/1.0\r\nHost: %s\r\nUser-Agent: EraldForge\r\n\r\n"
+SERVICE_PROBES = {
+    80: HTTP_PROBE, 81: HTTP_PROBE, 443: HTTP_PROBE, 591: HTTP_PROBE, 3000: HTTP_PROBE,
+    5000: HTTP_PROBE, 8000: HTTP_PROBE, 8008: HTTP_PROBE, 8080: HTTP_PROBE, 8081: HTTP_PROBE,
+    8443: HTTP_PROBE, 8888: HTTP_PROBE, 9000: HTTP_PROBE,
+    6379: b"PING\r\n",
+}
+# Port yang dibungkus TLS sebelum membaca banner / mengirim probe
+TLS_PORTS = {443, 465, 636, 853, 993, 995, 8443}
+
+# Tabel signature (dikompilasi sekali): (layanan, regex; grup 1 = versi jika ada)
+SERVICE_SIGNATURES = [(name, re.compile(rx, re.S)) for name, rx in (
+    ("ssh", rb"^SSH-[\d.]+-([^\r\n]+)"),
+    ("http", rb"^HTTP/\d\.\d \d{3}.*?\r?\n(?i:server):[ \t]*([^\r\n]+)"),
+    ("http", rb"^HTTP/\d\.\d \d{3}"),
+    ("ftp", rb"^220[ -][^\r\n]*?(\S*FTP\S*[^\r\n]*)"),
+    ("smtp", rb"^220[ -]\S+ (E?SMTP[^\r\n]*)"),
+    ("smtp", rb"^220[ -][^\r\n]*(?:mail|postfix|exim|sendmail)"),
+    ("ftp", rb"^220[ -]"),
+    ("pop3", rb"^\+OK ?([^\r\n]*)"),
+    ("imap", rb"^\* OK ?([^\r\n]*)"),
+    ("mysql", rb"^.{3}\x00\x0a([0-9][^\x00]*)\x00"),
+    ("redis", rb"^(?:\+PONG|-NOAUTH|-ERR)"),
+    ("vnc", rb"^RFB (\d{3}\.\d{3})"),
+    ("telnet", rb"^\xff[\xfb-\xfe]"),
+    ("rtsp", rb"^RTSP/\d\.\d \d{3}"),
+)]
+
+def match_service(banner):
+    """Cocokkan banner dengan SERVICE_SIGNATURES. Return (layanan, versi) atau ("unknown", "")"""
+    for name, rx in SERVICE_SIGNATURES:
+        m = rx.search(banner)
+        if m:
+            version = m.group(1) if rx.groups else b""
+            return name, version.decode(errors="replace").strip()
+    return "unknown", ""
+
+async def grab_banner(addr, port, timeout=None, server_name=None):
+    """Baca banner satu port (tunggu sapaan layanan, lalu kirim probe jika diam).
+    Seluruh proses dibatasi `timeout` sehingga layanan lambat tidak menahan yang lain."""
+    timeout = timeout or BANNER_TIMEOUT
+    tls = None
+    if port in TLS_PORTS:
+        tls = ssl.create_default_context()
+        tls.check_hostname = False
+        tls.verify_mode = ssl.CERT_NONE
+
+    async def talk():
+        reader, writer = await asyncio.open_connection(addr, port, ssl=tls,
+                                                       server_hostname=(server_name or addr) if tls else None)
+        try:
+            try:
+                data = await asyncio.wait_for(reader.read(1024), timeout / 3)
+            except asyncio.TimeoutError:
+                data = b""
+            if not data:
+                probe = SERVICE_PROBES.get(port, HTTP_PROBE)
+                writer.write(probe % (server_name or addr).encode() if b"%s" in probe else probe)
+                await writer.drain()
+                data = await reader.read(1024)
+            return data
+        finally:
+            writer.close()
+
+    try:
+        banner = await asyncio.wait_for(talk(), timeout)
+    except (asyncio.TimeoutError, OSError, ssl.SSLError, EOFError):
+        banner = b""
+    service, version = match_service(banner) if banner else ("unknown", "")
+    first_line = banner.split(b"\n", 1)[0].decode(errors="replace").strip()[:120]
+    return ServiceInfo(service, version, first_line)
+
+def _cached_services(host, ports):
+    """Hasil fingerprint yang masih berlaku (umur < BANNER_TTL) dari database riwayat"""
+    conn = history_db()
+    if conn is None or not ports:
+        return {}
+    out = {}
+    fresh_since = time.time() - BANNER_TTL
+    try:
+        for i in range(0, len(ports), 500):  # batas jumlah parameter SQLite
+            chunk = list(ports[i:i + 500])
+            rows = conn.execute(
+                f"SELECT port, service, version, banner FROM services WHERE host = ? AND ts >= ? AND port IN ({','.join('?' * len(chunk))})",
+                [host, fresh_since] + chunk)
+            out.update((port, ServiceInfo(service, version, banner)) for port, service, version, banner in rows)
+    except sqlite3.Error:
+        return {}  # database terkunci/rusak: probe ulang semua port tanpa cache
+    return out
+
+def _store_services(host, infos):
+    conn = history_db()
+    if conn is None or not infos:
+        return
+    try:
+        with conn:
+            conn.executemany("INSERT OR REPLACE INTO services (host, port, service, version, banner, ts) VALUES (?, ?, ?, ?, ?, ?)",
+                             [(host, port, i.service, i.version, i.banner, time.time()) for port, i in infos.items()])
+    except sqlite3.Error:
         pass
 
+async def _fingerprint_all(jobs, concurrency):
+    slots = asyncio.Semaphore(concurrency)
+
+    async def one(name, addr, port):
+        async with slots:
+            return name, port, await grab_banner(addr, port, server_name=name)
+
+    return await asyncio.gather(*(one(*job) for job in jobs))
+
+def fingerprint_services(results, concurrency=None):
+    """Tahap kedua setelah scan: banner/fingerprint setiap port open secara paralel.
+    results = {host: [open ports]}. Hasil di-cache per (host, port) selama BANNER_TTL.
+    Return {host: {port: ServiceInfo}}"""
+    out = {host: {} for host in results}
+    jobs = []
+    addrs = dict(resolve_hosts([h for h, opens in results.items() if opens]))
+    for host, opens in results.items():
+        if not opens or host not in addrs:
+            continue
+        cached = _cached_services(host, opens)
+        out[host].update(cached)
+        jobs.extend((host, addrs[host], p) for p in opens if p not in cached)
+    if jobs:
+        concurrency = min(fd_budget(concurrency or BANNER_CONCURRENCY), len(jobs))
+        fresh = {}
+        for host, port, info in asyncio.run(_fingerprint_all(jobs, concurrency)):
+            fresh.setdefault(host, {})[port] = info
+        for host, infos in fresh.items():
+            out[host].update(infos)
+            _store_services(host, infos)
+    return out
+
+def print_services(services):
+    for host, infos in services.items():
+        if not infos:
+            continue
+        print(C_BOX + BOLD + f"Layanan {host}:" + W)
+        for port in sorted(infos):
+            info = infos[port]
+            detail = info.version or info.banner
+            print(f"  {C_NEON}{port}/tcp{W} {G}{info.service:<8}{W} {detail}")
+
+# ---------------- Scan history (SQLite, WAL) ----------------
+HISTORY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS scans (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    mode TEXT NOT NULL,
+    target TEXT NOT NULL,
+    proto TEXT NOT NULL DEFAULT 'tcp',
+    ports_key TEXT
+);
+CREATE TABLE IF NOT EXISTS scan_ports (
+    scan_id INTEGER NOT NULL REFERENCES scans(id) ON DELETE CASCADE,
+    port INTEGER NOT NULL,
+    state TEXT NOT NULL DEFAULT 'open',
+    PRIMARY KEY (scan_id, port)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_scans_target_ts ON scans(target, ts);
+CREATE INDEX IF NOT EXISTS idx_scans_ts ON scans(ts);
+CREATE INDEX IF NOT EXISTS idx_scan_ports_port ON scan_ports(port, scan_id);
+CREATE TABLE IF NOT EXISTS services (
+    host TEXT NOT NULL,
+    port INTEGER NOT NULL,
+    service TEXT NOT NULL,
+    version TEXT,
+    banner TEXT,
+    ts REAL NOT NULL,
+    PRIMARY KEY (host, port)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS watch_hosts (
+    host TEXT NOT NULL,
+    proto TEXT NOT NULL,
+    last_full REAL,
+    last_check REAL NOT NULL,
+    PRIMARY KEY (host, proto)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS known_ports (
+    host TEXT NOT NULL,
+    proto TEXT NOT NULL,
+    port INTEGER NOT NULL,
+    since REAL NOT NULL,
+    checked REAL NOT NULL,
+    PRIMARY KEY (host, proto, port)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_known_ports_checked ON known_ports(host, proto, checked);
+"""
+_history_conn = None
+
+def history_db():
+    """Koneksi SQLite (WAL) ke SCAN_DB; schema dibuat & log teks lama diimpor sekali. None jika gagal"""
+    global _history_conn
+    if _history_conn is not None or sqlite3 is None:
+        return _history_conn
+    try:
+        conn = sqlite3.connect(str(SCAN_DB))
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(HISTORY_SCHEMA)
+        _migrate_scans(conn)
+        if conn.execute("PRAGMA user_version").fetchone()[0] < 1:
+            with conn:
+                _import_legacy_log(conn)
+                conn.execute("PRAGMA user_version = 1")
+        _history_conn = conn
+    except sqlite3.Error as e:
+        print(R + "Gagal membuka database riwayat: " + str(e) + W, file=sys.stderr)
+    return _history_conn
+
+def _migrate_scans(conn):
+    """Database lama belum punya kolom proto/ports_key; scan lama dianggap TCP (UDP bila mode-nya *_udp*)
+    dengan himpunan port tak diketahui (NULL)"""
+    cols = {row[1] for row in conn.execute("PRAGMA table_info(scans)")}
+    with conn:
+        if "proto" not in cols:
+            conn.execute("ALTER TABLE scans ADD COLUMN proto TEXT NOT NULL DEFAULT 'tcp'")
+            conn.execute("UPDATE scans SET proto = 'udp' WHERE mode LIKE '%udp%'")
+        if "ports_key" not in cols:
+            conn.execute("ALTER TABLE scans ADD COLUMN ports_key TEXT")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_scans_key ON scans(target, proto, ports_key, ts)")
+
+def ports_key(ports):
+    """Sidik (hash) himpunan port yang dipindai. Diff hanya membandingkan scan dengan proto & ports_key sama"""
+    if not ports:
+        return None
+    text = ",".join(map(str, sorted({int(p) for p in ports})))
+    return hashlib.sha1(text.encode()).hexdigest()[:16]
+
+def _import_legacy_log(conn):
+    """Impor baris '[iso] mode=.. target=.. open=[..]' dari SCAN_LOG lama (sekali saja)"""
+    if not SCAN_LOG.exists():
+        return
+    pattern = re.compile(r"^\[(?P<ts>[^\]]+)\] mode=(?P<mode>\S+) target=(?P<target>\S+) open=\[(?P<ports>[^\]]*)\]")
+    with open(SCAN_LOG, errors="replace") as f:
+        for line in f:
+            m = pattern.match(line)
+            if not m:
+                continue
+            try:
+                ts = datetime.fromisoformat(m["ts"]).timestamp()
+                ports = [int(p) for p in m["ports"].split(",") if p.strip()]
+            except ValueError:
+                continue
+            _insert_scan(conn, ts, m["mode"], m["target"], ports, "udp" if "udp" in m["mode"] else "tcp")
+
+def _insert_scan(conn, ts, mode, target, ports, proto="tcp", key=None):
+    cur = conn.execute("INSERT INTO scans (ts, mode, target, proto, ports_key) VALUES (?, ?, ?, ?, ?)",
+                       (ts, mode, target, proto, key))
+    conn.executemany("INSERT OR IGNORE INTO scan_ports (scan_id, port) VALUES (?, ?)",
+                     ((cur.lastrowid, int(p)) for p in ports))
+    return cur.lastrowid
+
+def log_scan(target, ports, mode="socket", proto="tcp", scanned=None):
+    """Menyimpan hasil scan (satu host) ke database riwayat. ports = port open, scanned = semua port
+    yang dipindai (disimpan sebagai ports_key). Return id scan atau None"""
+    conn = history_db()
+    if conn is None:
+        try:
+            with open(SCAN_LOG, "a") as f:
+                f.write(f"[{datetime.now().isoformat()}] mode={mode} target={target} open={ports}\n")
+        except Exception:
+            pass
+        return None
+    try:
+        with conn:
+            return _insert_scan(conn, time.time(), mode, target, ports, proto, ports_key(scanned))
+    except sqlite3.Error:
+        return None
+
+ScanRow = namedtuple("ScanRow", "id ts mode target proto ports_key open_ports")
+_SCAN_COLUMNS = "s.id, s.ts, s.mode, s.target, s.proto, s.ports_key"
+
+def query_scans(target=None, since=None, until=None, port=None, limit=40):
+    """Cari riwayat scan (terbaru dulu) berdasarkan target, rentang waktu (epoch), dan/atau port.
+    Return list ScanRow. Semua filter memakai index."""
+    conn = history_db()
+    if conn is None:
+        return []
+    where, params = [], []
+    if target:
+        where.append("s.target = ?"); params.append(target)
+    if since is not None:
+        where.append("s.ts >= ?"); params.append(since)
+    if until is not None:
+        where.append("s.ts <= ?"); params.append(until)
+    if port is not None:
+        where.append("s.id IN (SELECT scan_id FROM scan_ports WHERE port = ?)"); params.append(int(port))
+    sql = f"SELECT {_SCAN_COLUMNS} FROM scans s"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY s.ts DESC, s.id DESC LIMIT ?"
+    params.append(int(limit))
+    rows = conn.execute(sql, params).fetchall()
+    return [ScanRow(*row, scan_open_ports(row[0])) for row in rows]
+
+def get_scan(scan_id):
+    """Ambil satu scan berdasarkan id. Return ScanRow atau None"""
+    conn = history_db()
+    row = conn.execute(f"SELECT {_SCAN_COLUMNS} FROM scans s WHERE s.id = ?", (scan_id,)).fetchone() if conn else None
+    return ScanRow(*row, scan_open_ports(row[0])) if row else None
+
+def previous_scan(scan):
+    """Scan sebelumnya untuk target yang sama dengan proto & himpunan port sama (index idx_scans_key)"""
+    conn = history_db()
+    if conn is None:
+        return None
+    row = conn.execute(
+        f"SELECT {_SCAN_COLUMNS} FROM scans s WHERE s.target = ? AND s.proto = ? AND s.ports_key IS ?"
+        " AND (s.ts < ? OR (s.ts = ? AND s.id < ?)) ORDER BY s.ts DESC, s.id DESC LIMIT 1",
+        (scan.target, scan.proto, scan.ports_key, scan.ts, scan.ts, scan.id)).fetchone()
+    return ScanRow(*row, scan_open_ports(row[0])) if row else None
+
+def scan_open_ports(scan_id):
+    conn = history_db()
+    if conn is None:
+        return []
+    return [p for (p,) in conn.execute("SELECT port FROM scan_ports WHERE scan_id = ? AND state = 'open' ORDER BY port", (scan_id,))]
+
+def diff_scans(target, old_id=None, new_id=None):
+    """Bandingkan dua scan untuk host yang sama dengan protokol dan himpunan port yang sama
+    (default: scan terakhir vs scan sebelumnya yang sebanding).
+    Return (old_scan, new_scan, added, removed) atau None jika tidak ada pasangan yang sebanding"""
+    if old_id is None or new_id is None:
+        scans = query_scans(target=target, limit=1)
+        if not scans:
+            return None
+        new = scans[0]
+        old = previous_scan(new)
+        if old is None:
+            return None
+    else:
+        old, new = get_scan(old_id), get_scan(new_id)
+        if old is None or new is None or old.target != target or new.target != target:
+            return None
+        if (old.proto, old.ports_key) != (new.proto, new.ports_key):
+            return None  # TCP vs UDP atau daftar -p berbeda: port yang hilang bukan berarti tertutup
+    old_ports, new_ports = set(old.open_ports), set(new.open_ports)
+    return old, new, sorted(new_ports - old_ports), sorted(old_ports - new_ports)
+
+# ---------------- Watch: state terakhir per host + alert perubahan ----------------
+# Full sweep paling lama sekali per interval ini pada mode --stale; di antaranya hanya port yang diketahui open dicek
+WATCH_FULL_INTERVAL = float(os.environ.get("ERALDFORGE_WATCH_FULL", "86400"))
+WatchChange = namedtuple("WatchChange", "ts host port proto change")
+
+def load_watch_state(conn, hosts, proto):
+    """{host: (last_full, {port: checked})} untuk host yang sudah pernah di-watch"""
+    state = {}
+    for host in hosts:
+        row = conn.execute("SELECT last_full FROM watch_hosts WHERE host = ? AND proto = ?", (host, proto)).fetchone()
+        if row is None:
+            continue
+        ports = dict(conn.execute("SELECT port, checked FROM known_ports WHERE host = ? AND proto = ?", (host, proto)))
+        state[host] = (row[0], ports)
+    return state
+
+def _store_watch_result(conn, host, proto, states, known, full, now):
+    """Perbarui known_ports/watch_hosts dari hasil scan satu host. Return (added, removed)"""
+    now_open = {p for p, st in states.items() if st == "open"}
+    added = sorted(now_open - set(known))
+    # Hanya port yang benar-benar diprobe ulang yang bisa dinyatakan hilang
+    removed = sorted((set(known) & set(states)) - now_open)
+    conn.executemany(
+        "INSERT INTO known_ports (host, proto, port, since, checked) VALUES (?, ?, ?, ?, ?) "
+        "ON CONFLICT(host, proto, port) DO UPDATE SET checked = excluded.checked",
+        ((host, proto, p, now, now) for p in now_open))
+    conn.executemany("DELETE FROM known_ports WHERE host = ? AND proto = ? AND port = ?",
+                     ((host, proto, p) for p in removed))
+    conn.execute(
+        "INSERT INTO watch_hosts (host, proto, last_full, last_check) VALUES (?, ?, ?, ?) "
+        "ON CONFLICT(host, proto) DO UPDATE SET last_check = excluded.last_check, "
+        "last_full = COALESCE(excluded.last_full, watch_hosts.last_full)",
+        (host, proto, now if full else None, now))
+    return added, removed
+
+def watch_scan(targets, ports, engine=None, stale=None, full_every=None):
+    """Scan berulang yang hanya melaporkan perubahan terhadap state terakhir per host.
+    stale=None: full sweep setiap kali. stale=N detik: hanya port yang diketahui open dan terakhir
+    dicek > N detik lalu yang diprobe ulang; full sweep tetap dilakukan bila host baru atau
+    full sweep terakhir lebih tua dari full_every (default WATCH_FULL_INTERVAL).
+    Return (changes [WatchChange], ringkasan dict). Host pertama kali = baseline, bukan perubahan."""
+    conn = history_db()
+    if conn is None:
+        raise RuntimeError("mode watch membutuhkan sqlite3 (database riwayat tidak tersedia)")
+    full_every = WATCH_FULL_INTERVAL if full_every is None else full_every
+    proto = SCAN_PROTO
+    now = time.time()
+    known = load_watch_state(conn, targets, proto)
+    full_hosts, delta_hosts, delta_due = [], [], {}  # delta_due: host -> port jatuh tempo milik host itu
+    for name in targets:
+        last_full, ports_checked = known.get(name, (None, {}))
+        if stale is None or last_full is None or now - last_full >= full_every:
+            full_hosts.append(name)
+            continue
+        due = tuple(sorted(p for p, checked in ports_checked.items() if now - checked >= stale))
+        if due:
+            delta_hosts.append(name)
+            delta_due[name] = due
+
+    # Host delta dengan himpunan port jatuh tempo yang sama dipindai bersama; tiap host hanya pada port miliknya
+    passes = [(full_hosts, ports)]
+    groups = {}
+    for name in delta_hosts:
+        groups.setdefault(delta_due[name], []).append(name)
+    passes += [(hosts, list(due)) for due, hosts in groups.items()]
+
+    results = {}
+    probes = 0
+    for hosts, scan_ports_ in passes:
+        if hosts and scan_ports_:
+            for res in iter_scan(hosts, scan_ports_, engine):
+                if res.state == "error":
+                    continue  # tidak dipindai: state lama dipertahankan
+                results.setdefault(res.host, {})[res.port] = res.state
+                probes += 1
+
+    changes, baseline, silent = [], [], []
+    mode = f"{(engine or SCAN_ENGINE).lower()}{'_udp' if proto == 'udp' else ''}_watch"
+    with conn:
+        for name in full_hosts + delta_hosts:
+            states = results.get(name)
+            if not states:
+                silent.append(name)  # tidak merespons / gagal resolve: state lama dipertahankan
+                continue
+            prev = known.get(name)
+            prev_ports = prev[1] if prev else {}
+            added, removed = _store_watch_result(conn, name, proto, states, prev_ports,
+                                                 name in full_hosts, now)
+            if prev is None:
+                baseline.append(name)
+            else:
+                changes += [WatchChange(now, name, p, proto, "added") for p in added]
+                changes += [WatchChange(now, name, p, proto, "removed") for p in removed]
+            current = (set(prev_ports) | set(added)) - set(removed)
+            _insert_scan(conn, now, mode, name, sorted(current), proto, ports_key(ports))
+    summary = {"hosts": len(targets), "full": len(full_hosts), "delta": len(delta_hosts),
+               "skipped": len(targets) - len(full_hosts) - len(delta_hosts), "probes": probes,
+               "baseline": baseline, "silent": silent}
+    return changes, summary
+
+# ---------------- Checkpoint / resume ----------------
+class ScanCheckpoint:
+    """Progres scan socket yang bisa dilanjutkan (--resume).
+    Per host disimpan bitmap ringkas: bit ke-i = port ke-i dari daftar port sudah final,
+    ditambah daftar port open. Disimpan berkala (CHECKPOINT_INTERVAL) ke CHECKPOINT_FILE."""
+
+    def __init__(self, target, mode, hosts, ports):
+        self.target = target
+        self.mode = mode
+        self.hosts = list(hosts)
+        self.ports = list(ports)
+        self.index = {p: i for i, p in enumerate(self.ports)}
+        size = (len(self.ports) + 7) // 8
+        self.done = {h: bytearray(size) for h in self.hosts}
+        self.opens = {}
+        self.completed = 0
+        self._last_save = time.monotonic()
+
+    def is_done(self, host, port):
+        i = self.index[port]
+        return bool(self.done[host][i >> 3] & (1 << (i & 7)))
+
+    def mark(self, res):
+        if res.state == "error":
+            return  # tidak dipindai (worker shard gagal): biarkan untuk --resume
+        i = self.index.get(res.port)
+        bitmap = self.done.get(res.host)
+        if i is None or bitmap is None or bitmap[i >> 3] & (1 << (i & 7)):
+            return
+        bitmap[i >> 3] |= 1 << (i & 7)
+        self.completed += 1
+        if res.state == "open":
+            self.opens.setdefault(res.host, []).append(res.port)
+        if time.monotonic() - self._last_save >= CHECKPOINT_INTERVAL:
+            self.save()
+
+    def retain(self, names):
+        """Buang host yang tidak ikut dipindai (gagal resolve / mati menurut discovery),
+        agar tidak dihitung sebagai progres yang belum selesai"""
+        keep = set(names)
+        for h in [h for h in self.hosts if h not in keep]:
+            self.completed -= bin(int.from_bytes(self.done.pop(h), "little")).count("1")
+            self.opens.pop(h, None)
+        self.hosts = [h for h in self.hosts if h in keep]
+
+    def progress(self):
+        total = len(self.hosts) * len(self.ports)
+        return f"{self.completed}/{total} probe"
+
+    def finished(self):
+        return self.completed >= len(self.hosts) * len(self.ports)
+
+    def save(self):
+        """Tulis checkpoint secara atomik (file sementara lalu os.replace)"""
+        data = {
+            "version": 1, "target": self.target, "mode": self.mode, "engine": SCAN_ENGINE,
+            "saved": time.time(), "hosts": self.hosts,
+            "ports": base64.b64encode(zlib.compress(array("H", self.ports).tobytes())).decode(),
+            "done": {h: base64.b64encode(zlib.compress(bytes(bm))).decode() for h, bm in self.done.items() if any(bm)},
+            "open": self.opens,
+        }
+        tmp = CHECKPOINT_FILE.with_suffix(".tmp")
+        try:
+            with gzip.open(tmp, "wt") as f:
+                json.dump(data, f)
+            os.replace(tmp, CHECKPOINT_FILE)
+        except OSError as e:
+            print(R + "Gagal menyimpan checkpoint: " + str(e) + W, file=sys.stderr)
+        self._last_save = time.monotonic()
+
+    @classmethod
+    def load(cls):
+        """Baca CHECKPOINT_FILE. Return ScanCheckpoint atau None jika tidak ada/rusak"""
+        try:
+            with gzip.open(CHECKPOINT_FILE, "rt") as f:
+                data = json.load(f)
+            ports = array("H")
+            ports.frombytes(zlib.decompress(base64.b64decode(data["ports"])))
+            ckpt = cls(data["target"], data["mode"], data["hosts"], ports)
+            for h, blob in data.get("done", {}).items():
+                if h in ckpt.done:
+                    ckpt.done[h][:] = zlib.decompress(base64.b64decode(blob))
+            ckpt.opens = {h: list(v) for h, v in data.get("open", {}).items()}
+            ckpt.engine = data.get("engine")
+            ckpt.completed = sum(bin(int.from_bytes(bm, "little")).count("1") for bm in ckpt.done.values())
+            return ckpt
+        except (OSError, ValueError, KeyError, zlib.error, EOFError):
+            return None
+
+    @staticmethod
+    def clear():
+        try:
+            CHECKPOINT_FILE.unlink()
+        except OSError:
+            pass
+
+def parse_duration(text):
+    """'90' / '90s' / '15m' / '2h' / '1d' -> detik (float); argparse type"""
+    text = str(text).strip().lower()
+    units = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+    try:
+        if text and text[-1] in units:
+            return float(text[:-1]) * units[text[-1]]
+        return float(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"durasi tidak valid: {text} (contoh: 900, 15m, 2h, 1d)")
+
+def parse_time_arg(text):
+    """'2026-01-31' / '2026-01-31T08:00' -> epoch (float). ValueError jika format salah"""
+    return datetime.fromisoformat(text.strip()).timestamp()
+
 def parse_ports_text(text):
     """Mengurai input port kustom (misal: 22,80,443 atau 20-25)"""
     out = set()
@@ -141,79 +1843,227 @@ def parse_ports_text(text):
                 pass
     return sorted(out)
 
+def _expand_ip_range(part):
+    """'10.0.0.5-20' atau '10.0.0.5-10.0.0.20' -> (awal, akhir). None jika bukan rentang IP"""
+    left, right = part.split("-", 1)
+    try:
+        start = ipaddress.ip_address(left)
+    except ValueError:
+        return None  # bukan IP, mis. hostname yang mengandung '-'
+    if right.isdigit() and start.version == 4:
+        end = ipaddress.ip_address(left.rsplit(".", 1)[0] + "." + right)
+    else:
+        end = ipaddress.ip_address(right)
+    if end < start:
+        start, end = end, start
+    return start, end
+
+def expand_targets(spec, _allow_file=True):
+    """Uraikan spesifikasi target menjadi daftar host unik (urutan dipertahankan).
+    Mendukung host/IP tunggal, CIDR (192.168.1.0/24), rentang (192.168.1.10-50 atau
+    192.168.1.10-192.168.1.50), daftar dipisah koma/spasi, dan @file (satu target per baris).
+    ValueError jika format tidak valid atau jumlah host melebihi MAX_TARGETS."""
+    out = {}  # dict sebagai ordered set
+
+    def add(host):
+        host = str(host)
+        if host.startswith("[") and host.endswith("]"):
+            host = host[1:-1]  # literal IPv6 bergaya URL: [2001:db8::1]
+        out.setdefault(host, None)
+        if len(out) > MAX_TARGETS:
+            raise ValueError(f"lebih dari {MAX_TARGETS} host (ERALDFORGE_SCAN_MAX_TARGETS)")
+
+    for part in spec.replace(",", " ").split():
+        if part.startswith("@"):
+            if not _allow_file:
+                raise ValueError(f"@file bersarang tidak didukung: {part}")
+            with open(os.path.expanduser(part[1:])) as f:
+                for line in f:
+                    line = line.split("#", 1)[0].strip()
+                    if line:
+                        for h in expand_targets(line, _allow_file=False):
+                            add(h)
+        elif "/" in part:
+            net = ipaddress.ip_network(part, strict=False)
+            if net.num_addresses > MAX_TARGETS:
+                raise ValueError(f"{part} berisi {net.num_addresses} alamat (maks {MAX_TARGETS})")
+            for h in list(net.hosts()) or [net.network_address]:
+                add(h)
+        elif "-" in part and (rng := _expand_ip_range(part)):
+            start, end = rng
+            if int(end) - int(start) + 1 > MAX_TARGETS:
+                raise ValueError(f"rentang {part} terlalu besar (maks {MAX_TARGETS})")
+            for i in range(int(end) - int(start) + 1):
+                add(start + i)
+        else:
+            add(part)
+    return list(out)
+
 # ---------------- Menu / Interaction ----------------
 def print_header(target, using_nmap):
     print()
     print(C_BOX + BOLD + "Target: " + C_NEON + f"{target}" + W)
     print(C_BOX + "Waktu : " + datetime.now().strftime("%Y-%m-%d %H:%M:%S") + W)
-    print(C_BOX + "Engine: " + (G + "nmap (detected)" + W if using_nmap else Y + "socket fallback" + W))
+    print(C_BOX + "Engine: " + (G + "nmap (detected)" + W if using_nmap else Y + f"socket fallback ({SCAN_ENGINE})" + W) + C_BOX + f" | Protokol: {SCAN_PROTO.upper()}" + W)
     print(C_BOX + "════════════════════════════════════════════════════════════════" + W)
 
 def show_main_menu():
     print()
     print(C_BOX + BOLD + "PILIH MODE SCAN (masukkan angka lalu Enter):" + W)
-    print(f"  {C_NEON}1{W} - Top ports (recommended, cepat)")
+    print(f"  {C_NEON}1{W} - Top {TOP_PORT_COUNT} ports (recommended, cepat)")
     print(f"  {C_NEON}2{W} - Range 1-1024 (lebih lama)")
     print(f"  {C_NEON}3{W} - Custom ports / rentang")
     print(f"  {C_NEON}4{W} - Auto scan top ports langsung (tanpa input)")
-    print(f"  {C_NEON}5{W} - Set timeout / workers")
+    print(f"  {C_NEON}5{W} - Set timeout / workers / engine")
     print(f"  {C_NEON}6{W} - Tampilkan log scan terakhir")
-    print(f"  {C_NEON}7{W} - Keluar")
+    print(f"  {C_NEON}7{W} - Cari riwayat (target / port / waktu)")
+    print(f"  {C_NEON}8{W} - Bandingkan 2 scan terakhir (diff)")
+    print(f"  {C_NEON}9{W} - Keluar")
     print()
 
-def show_log_tail(lines=40):
-    if not SCAN_LOG.exists():
-        print(Y + "Belum ada log scan." + W)
-        return
-    try:
-        with open(SCAN_LOG, "r") as f:
-            data = f.readlines()[-lines:]
+def _format_scan(scan):
+    when = datetime.fromtimestamp(scan.ts).isoformat(timespec="seconds")
+    return f"#{scan.id} [{when}] mode={scan.mode} proto={scan.proto} target={scan.target} open={scan.open_ports}"
+
+def show_log_tail(lines=40, target=None, since=None, until=None, port=None):
+    """Tampilkan riwayat scan terakhir (opsional difilter). Tidak membaca seluruh riwayat"""
+    if history_db() is None:
+        if not SCAN_LOG.exists():
+            print(Y + "Belum ada log scan." + W)
+            return
+        # Fallback teks: baca hanya ekor file
+        with open(SCAN_LOG, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            f.seek(max(0, f.tell() - 200 * lines))
+            data = f.read().decode(errors="replace").splitlines()[-lines:]
         print(C_BOX + "===== Scan log (tail) =====" + W)
         for r in data:
             print(r.rstrip())
         print(C_BOX + "===========================" + W)
-    except Exception as e:
-        print(R + "Gagal baca log: " + str(e) + W)
+        return
+    scans = query_scans(target=target, since=since, until=until, port=port, limit=lines)
+    if not scans:
+        print(Y + "Belum ada log scan (atau tidak ada yang cocok dengan filter)." + W)
+        return
+    print(C_BOX + "===== Scan log (tail) =====" + W)
+    for scan in reversed(scans):
+        print(_format_scan(scan))
+    print(C_BOX + "===========================" + W)
+
+def show_scan_diff(target, old_id=None, new_id=None):
+    """Cetak perbedaan port open antara dua scan host yang sama"""
+    res = diff_scans(target, old_id, new_id)
+    if res is None:
+        print(Y + f"Riwayat untuk '{target}' belum cukup (butuh 2 scan dengan protokol & daftar port yang sama)." + W)
+        return
+    old, new, added, removed = res
+    print(C_BOX + "Lama: " + _format_scan(old) + W)
+    print(C_BOX + "Baru: " + _format_scan(new) + W)
+    if not added and not removed:
+        print(G + "Tidak ada perubahan port." + W)
+    for p in added:
+        print(G + f"  + {p} (baru terbuka)" + W)
+    for p in removed:
+        print(R + f"  - {p} (tidak lagi terbuka)" + W)
 
-def perform_scan(target, using_nmap, mode, ports=None, nmap_args=None):
-    """Menjalankan pemindaian berdasarkan mode yang dipilih"""
+def history_menu():
+    """Prompt filter riwayat: target, port, rentang waktu"""
+    tgt = input(G + "Filter target (Enter = semua): " + W).strip() or None
+    port = input(G + "Filter port (Enter = semua): " + W).strip()
+    since = input(G + "Sejak (YYYY-MM-DD[THH:MM], Enter = bebas): " + W).strip()
+    until = input(G + "Sampai (YYYY-MM-DD[THH:MM], Enter = bebas): " + W).strip()
+    try:
+        show_log_tail(40, target=tgt, port=int(port) if port else None,
+                      since=parse_time_arg(since) if since else None,
+                      until=parse_time_arg(until) if until else None)
+    except ValueError:
+        print(R + "Format port/tanggal tidak valid." + W)
+
+def perform_scan(target, using_nmap, mode, ports=None, nmap_args=None, checkpoint=None):
+    """Menjalankan pemindaian berdasarkan mode yang dipilih.
+    target boleh berupa host tunggal, CIDR, rentang, daftar, atau @file. Return {host: [open ports]}.
+    checkpoint = ScanCheckpoint dari --resume untuk melanjutkan scan socket yang terputus."""
     global DEFAULT_TIMEOUT, MAX_WORKERS
     
+    udp = SCAN_PROTO == "udp"
     if ports is None and mode in ("top", "auto"):
-        # Top 13 ports standar
-        ports = [22,80,443,21,23,25,53,110,143,445,3389,3306,8080]
+        ports = top_ports(proto="udp" if udp else "tcp")
     elif ports is None and mode == "range_1024":
         ports = list(range(1, 1025))
 
+    if checkpoint:
+        hosts, ports = checkpoint.hosts, checkpoint.ports
+    else:
+        try:
+            hosts = expand_targets(target)
+        except (ValueError, OSError) as e:
+            print(R + f"Target tidak valid: {e}" + W)
+            return {}
+    if not hosts:
+        print(R + "Tidak ada target." + W)
+        return {}
+
     start = time.time()
-    print(C_BOX + f"Mulai scan mode '{mode}' -> {len(ports)} ports" + W)
+    print(C_BOX + f"Mulai scan mode '{mode}' -> {len(hosts)} host x {len(ports)} ports" + W)
 
     if using_nmap:
         # Jika Nmap terdeteksi, gunakan Nmap (dengan argumen yang sesuai)
-        final_args = nmap_args if nmap_args is not None else []
-        if mode in ("range_1024", "custom"):
-            # Untuk range/custom, Nmap perlu argumen port spesifik
-            port_str = ",".join(map(str, ports))
-            final_args = ["-p", port_str] + final_args
-        run_nmap(target, final_args)
-        opens = [] # Tidak bisa mendapatkan hasil dari output nmap dengan mudah
+        # Port selalu eksplisit agar Nmap memindai himpunan yang sama dengan engine socket
+        final_args = ["-p", ",".join(map(str, ports))] + (nmap_args if nmap_args is not None else [])
+        results = run_nmap(hosts, final_args, protocol=SCAN_PROTO)
+    elif udp:
+        # UDP: open = ada jawaban, closed = ICMP port unreachable, sisanya open|filtered
+        udp_hosts = resolve_hosts(hosts)
+        if HOST_DISCOVERY and len(udp_hosts) > 1:
+            udp_hosts = discover_hosts(udp_hosts)
+        results, maybe = udp_scan_hosts(udp_hosts, ports, verbose=mode=="custom")
+        silent = sum(maybe.values())
+        if silent:
+            print(Y + f"{silent} port tanpa jawaban (open|filtered)." + W)
     else:
-        # Fallback ke Socket Scan
-        opens = socket_scan(target, ports, timeout=DEFAULT_TIMEOUT, workers=MAX_WORKERS, verbose=mode=="custom")
-        if opens:
-            print(G + "Open ports: " + ", ".join(map(str, opens)) + W)
+        # Fallback ke Socket Scan (engine async atau thread), semua host dalam satu pass
+        ports = normalize_ports(ports) or []
+        if checkpoint:
+            print(C_BOX + f"Melanjutkan scan terputus: {checkpoint.progress()} sudah selesai" + W)
         else:
-            print(Y + "Tidak ada port terbuka terdeteksi." + W)
-        
-    if opens:
-        log_scan(target, opens, mode=f"socket_{mode}")
+            checkpoint = ScanCheckpoint(target, mode, hosts, ports)
+        try:
+            results = scan_hosts(hosts, ports, verbose=mode=="custom", checkpoint=checkpoint)
+        except KeyboardInterrupt:
+            checkpoint.save()
+            print(Y + f"\nScan dihentikan, progres disimpan ({checkpoint.progress()}). Lanjutkan dengan --resume" + W)
+            raise
+        if checkpoint.finished():
+            checkpoint.clear()
+        else:
+            checkpoint.save()
+            print(Y + f"Scan belum lengkap ({checkpoint.progress()}), progres disimpan. Lanjutkan dengan --resume" + W)
+
+    found = {h: o for h, o in results.items() if o}
+    if len(hosts) == 1 and found:
+        print(G + "Open ports: " + ", ".join(map(str, next(iter(found.values())))) + W)
+    elif found:
+        for host, opens in found.items():
+            print(G + f"{host}: " + ", ".join(map(str, opens)) + W)
+        print(C_BOX + f"{len(found)}/{len(hosts)} host memiliki port terbuka." + W)
+    else:
+        print(Y + "Tidak ada port terbuka terdeteksi." + W)
+
+    if GRAB_BANNERS and found and not udp:
+        print(C_BOX + "Banner grabbing & fingerprint layanan..." + W)
+        print_services(fingerprint_services(found))
+
+    # Semua host dicatat (termasuk tanpa port open) agar diff antar scan akurat
+    engine = ("nmap" if using_nmap else "socket") + ("_udp" if udp else "")
+    for host, opens in results.items():
+        log_scan(host, opens, mode=f"{engine}_{mode}", proto="udp" if udp else "tcp", scanned=ports)
     
     print(C_BOX + f"Selesai. Durasi: {time.time()-start:.1f}s" + W)
-    return opens
+    return results
 
 # ---------------- Main Interactive ----------------
 def interactive_main(auto_target=None):
-    global TARGET, DEFAULT_TIMEOUT, MAX_WORKERS
+    global TARGET, DEFAULT_TIMEOUT, MAX_WORKERS, MAX_CONCURRENCY, SCAN_ENGINE, PROBE_RATE, GRAB_BANNERS, SCAN_PROTO, TOP_PORT_COUNT
     
     print_banner()
     using_nmap = has_nmap()
@@ -221,12 +2071,14 @@ def interactive_main(auto_target=None):
     # Ambil target dari argparse, env var, atau minta input
     TARGET = auto_target or TARGET
     if not TARGET:
-        TARGET = input(G + "Masukkan target IP/domain: " + W).strip()
+        TARGET = input(G + "Masukkan target IP/domain/CIDR/rentang/@file: " + W).strip()
         if not TARGET:
             print(R + "Tidak ada target. Keluar." + W)
             return
     
     print_header(TARGET, using_nmap)
+    if CHECKPOINT_FILE.exists():
+        print(Y + "Ada scan terputus yang tersimpan. Jalankan dengan --resume untuk melanjutkan." + W)
     
     # Jika dipanggil dengan --target, langsung jalankan auto scan (Mode 4)
     if auto_target:
@@ -236,7 +2088,7 @@ def interactive_main(auto_target=None):
 
     while True:
         show_main_menu()
-        choice = input(G + "Pilihan [1-7]: " + W).strip()
+        choice = input(G + "Pilihan [1-9]: " + W).strip()
         
         if choice == "1":
             perform_scan(TARGET, using_nmap, "top")
@@ -252,28 +2104,330 @@ def interactive_main(auto_target=None):
         elif choice == "4":
             perform_scan(TARGET, using_nmap, "auto")
         elif choice == "5":
-            print(C_BOX + f"Timeout saat ini: {DEFAULT_TIMEOUT}s, Workers: {MAX_WORKERS}" + W)
+            print(C_BOX + f"Timeout saat ini: {DEFAULT_TIMEOUT}s, Workers: {MAX_WORKERS}, Concurrency: {MAX_CONCURRENCY}, Engine: {SCAN_ENGINE}" + W)
             t = input(G + "Set timeout (Enter = tetap): " + W).strip()
             w = input(G + "Set workers (Enter = tetap): " + W).strip()
+            c = input(G + "Set concurrency async (Enter = tetap): " + W).strip()
+            e = input(G + "Set engine async/thread/shard (Enter = tetap): " + W).strip().lower()
+            r = input(G + f"Set rate probe/detik, 0 = tanpa batas (saat ini {PROBE_RATE}, Enter = tetap): " + W).strip()
+            pr = input(G + f"Protokol tcp/udp (saat ini {SCAN_PROTO}, Enter = tetap): " + W).strip().lower()
+            bg = input(G + f"Banner grabbing y/n (saat ini {'y' if GRAB_BANNERS else 'n'}, Enter = tetap): " + W).strip().lower()
+            tp = input(G + f"Jumlah top ports (saat ini {TOP_PORT_COUNT}, Enter = tetap): " + W).strip()
             if t:
                 try: DEFAULT_TIMEOUT = float(t); print(G + f"Timeout diubah menjadi {DEFAULT_TIMEOUT}s" + W)
                 except: print(R + "Format timeout tidak valid." + W)
             if w:
                 try: MAX_WORKERS = int(w); print(G + f"Workers diubah menjadi {MAX_WORKERS}" + W)
                 except: print(R + "Format workers tidak valid." + W)
+            if c:
+                try: MAX_CONCURRENCY = int(c); print(G + f"Concurrency diubah menjadi {MAX_CONCURRENCY}" + W)
+                except: print(R + "Format concurrency tidak valid." + W)
+            if e:
+                if e in SOCKET_ENGINES: SCAN_ENGINE = e; print(G + f"Engine diubah menjadi {SCAN_ENGINE}" + W)
+                else: print(R + "Engine harus 'async', 'thread' atau 'shard'." + W)
+            if r:
+                try: PROBE_RATE = max(0.0, float(r)); print(G + f"Rate diubah menjadi {PROBE_RATE or 'tanpa batas'}" + W)
+                except ValueError: print(R + "Format rate tidak valid." + W)
+            if pr:
+                if pr in ("tcp", "udp"): SCAN_PROTO = pr; print(G + f"Protokol diubah menjadi {SCAN_PROTO}" + W)
+                else: print(R + "Protokol harus 'tcp' atau 'udp'." + W)
+            if bg in ("y", "n"):
+                GRAB_BANNERS = bg == "y"; print(G + f"Banner grabbing {'aktif' if GRAB_BANNERS else 'nonaktif'}" + W)
+            if tp:
+                try: TOP_PORT_COUNT = max(1, int(tp)); print(G + f"Top ports diubah menjadi {TOP_PORT_COUNT}" + W)
+                except ValueError: print(R + "Format jumlah top ports tidak valid." + W)
         elif choice == "6":
             show_log_tail(40)
         elif choice == "7":
+            history_menu()
+        elif choice == "8":
+            tgt = input(G + f"Host (Enter = {TARGET}): " + W).strip() or TARGET
+            show_scan_diff(tgt)
+        elif choice == "9":
             print(G + "Keluar dari EraldForge. Sampai jumpa!" + W)
             break
         else:
-            print(R + "Pilihan tidak valid. Masukkan angka 1-7." + W)
+            print(R + "Pilihan tidak valid. Masukkan angka 1-9." + W)
+
+# ---------------- CLI non-interaktif ----------------
+OUTPUT_FORMATS = ("text", "json", "jsonl", "csv", "grep")
+CSV_FIELDS = ["host", "port", "proto", "state", "latency_ms", "service", "version", "banner"]
+
+def disable_colors():
+    """Kosongkan kode ANSI (cron/pipe tanpa TTY atau NO_COLOR)"""
+    global C_NEON, C_BOX, G, R, Y, W, BOLD
+    C_NEON = C_BOX = G = R = Y = W = BOLD = ""
+
+def cli_ports(args):
+    """Port dari --ports / --top-ports; default top_ports() (TCP atau UDP sesuai --udp)"""
+    proto = "udp" if SCAN_PROTO == "udp" else "tcp"
+    ports = []
+    if args.ports:
+        ports = parse_ports_text(args.ports)
+        if not ports:
+            raise ValueError(f"tidak ada port valid di '{args.ports}'")
+    if args.top_ports:
+        ports = ports + top_ports(args.top_ports, proto)
+    if not ports:
+        ports = top_ports(proto=proto)
+    return normalize_ports(ports)
+
+def iter_cli_results(targets, ports, engine):
+    """Seperti iter_scan, plus engine nmap (hanya port open, tanpa latency)"""
+    if engine != "nmap":
+        yield from iter_scan(targets, ports, engine)
+        return
+    proto = "udp" if SCAN_PROTO == "udp" else "tcp"
+    found = run_nmap(targets, ["-p", ",".join(map(str, ports))], protocol=proto)
+    for host, opens in found.items():
+        for p in opens:
+            yield PortResult(host, p, "open", None)
+
+def write_results(fmt, records, out):
+    """Tulis hasil akhir (list dict result_record) dalam format json/csv/grep/text/jsonl"""
+    if fmt == "json":
+        hosts = {}
+        for rec in records:
+            hosts.setdefault(rec["host"], []).append({k: v for k, v in rec.items() if k != "host"})
+        json.dump({"hosts": [{"host": h, "ports": ps} for h, ps in hosts.items()]}, out, indent=2)
+        out.write("\n")
+    elif fmt == "csv":
+        import csv
+        writer = csv.DictWriter(out, fieldnames=CSV_FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(records)
+    elif fmt == "grep":
+        # Gaya nmap -oG: satu baris per host, port dipisah koma
+        hosts = {}
+        for rec in records:
+            hosts.setdefault(rec["host"], []).append(rec)
+        for host, recs in hosts.items():
+            entries = ", ".join(f"{r['port']}/{r['state']}/{r['proto']}//{r.get('service') or ''}//{r.get('version') or ''}/"
+                                for r in recs)
+            out.write(f"Host: {host} ()\tPorts: {entries}\n")
+    elif fmt == "jsonl":
+        for rec in records:
+            out.write(json.dumps(rec) + "\n")
+    else:
+        for rec in records:
+            service = f"\t{rec['service']}" if rec.get("service") else ""
+            out.write(f"{rec['host']}\t{rec['port']}/{rec['proto']}\t{rec['state']}{service}\n")
+
+def run_cli(args, targets):
+    """Scan tanpa menu/banner/warna. Hasil ke stdout atau --output; info/progress ke stderr.
+    Return exit code."""
+    engine = (args.engine or SCAN_ENGINE).lower()
+    ports = cli_ports(args)
+    out = open(args.output, "w", newline="") if args.output else sys.stdout
+    info = open(os.devnull, "w") if args.quiet else sys.stderr
+    info_cm = info if args.quiet else contextlib.nullcontext(info)
+    # jsonl/text tanpa banner grabbing ditulis bertahap; format lain dirangkai di akhir
+    stream = args.format in ("jsonl", "text") and not GRAB_BANNERS
+    results = []
+    opens = {}
+    start = time.time()
+    try:
+        with info_cm, contextlib.redirect_stdout(info):
+            for res in iter_cli_results(targets, ports, engine):
+                opens.setdefault(res.host, [])
+                if res.state == "open":
+                    opens[res.host].append(res.port)
+                if not (args.all_states or res.state == "open"):
+                    continue
+                if stream:
+                    write_results(args.format, [result_record(res)], out)
+                    out.flush()
+                else:
+                    results.append(res)
+            services = {}
+            if GRAB_BANNERS and SCAN_PROTO != "udp":
+                services = fingerprint_services({h: p for h, p in opens.items() if p})
+            if not stream:
+                records = [result_record(r, services.get(r.host, {}).get(r.port)) for r in results]
+                write_results(args.format, records, out)
+            if not args.no_log:
+                for host, found in opens.items():
+                    log_scan(host, sorted(found), f"{engine}{'_udp' if SCAN_PROTO == 'udp' else ''}_cli",
+                             proto="udp" if SCAN_PROTO == "udp" else "tcp", scanned=ports)
+            print(f"{sum(map(len, opens.values()))} port open di {len(opens)} host, "
+                  f"{len(ports)} port/host, {time.time()-start:.2f}s")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 0
+
+def write_changes(fmt, changes, out):
+    """Tulis perubahan watch (WatchChange) dalam format text/json/jsonl/csv/grep"""
+    records = [{"ts": datetime.fromtimestamp(c.ts).isoformat(timespec="seconds"), "host": c.host,
+                "port": c.port, "proto": c.proto, "change": c.change} for c in changes]
+    if fmt == "json":
+        json.dump({"changes": records}, out, indent=2)
+        out.write("\n")
+    elif fmt == "jsonl":
+        for rec in records:
+            out.write(json.dumps(rec) + "\n")
+    elif fmt == "csv":
+        import csv
+        writer = csv.DictWriter(out, fieldnames=["ts", "host", "port", "proto", "change"])
+        writer.writeheader()
+        writer.writerows(records)
+    else:
+        for rec in records:
+            sign = "+" if rec["change"] == "added" else "-"
+            out.write(f"{rec['ts']}\t{sign}\t{rec['host']}\t{rec['port']}/{rec['proto']}\n")
+
+def run_watch(args, targets):
+    """Mode --watch: scan, bandingkan dengan state tersimpan, tulis hanya perubahan.
+    Exit code 1 jika ada perubahan (seperti diff), 0 jika tidak ada."""
+    engine = (args.engine or SCAN_ENGINE).lower()
+    if engine not in SOCKET_ENGINES:
+        raise ValueError("mode watch hanya mendukung engine socket (async/thread/shard)")
+    ports = cli_ports(args)
+    info = open(os.devnull, "w") if args.quiet else sys.stderr
+    info_cm = info if args.quiet else contextlib.nullcontext(info)
+    out = open(args.output, "a" if args.format in ("text", "jsonl") else "w", newline="") if args.output else sys.stdout
+    start = time.time()
+    try:
+        with info_cm, contextlib.redirect_stdout(info):
+            try:
+                changes, summary = watch_scan(targets, ports, engine, args.stale, args.full_every)
+            except RuntimeError as e:
+                raise ValueError(str(e))
+            write_changes(args.format, changes, out)
+            added = sum(c.change == "added" for c in changes)
+            print(f"Watch: {summary['hosts']} host (full {summary['full']}, delta {summary['delta']}, "
+                  f"dilewati {summary['skipped']}), {summary['probes']} probe, +{added} -{len(changes) - added}, "
+                  f"{time.time()-start:.2f}s")
+            if summary["baseline"]:
+                print(f"Baseline baru: {', '.join(summary['baseline'][:10])}"
+                      + (" ..." if len(summary["baseline"]) > 10 else ""))
+            if summary["silent"]:
+                print(f"Tidak merespons (state lama dipertahankan): {', '.join(summary['silent'][:10])}"
+                      + (" ..." if len(summary["silent"]) > 10 else ""))
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 1 if changes else 0
 
 # ---------------- Entrypoint ----------------
 if __name__ == "__main__":
-    parser = argparse.ArgumentParser(description="EraldForge Port Scanner")
-    parser.add_argument("--target", help="Target IP/domain untuk auto scan")
+    parser = argparse.ArgumentParser(
+        description="EraldForge Port Scanner",
+        epilog="Tanpa target/format: menu interaktif. Dengan target + --format/--output/--ports/--top-ports "
+               "(atau stdout bukan TTY): mode non-interaktif tanpa banner & warna.")
+    parser.add_argument("targets", nargs="*", help="Target IP/domain/CIDR/rentang/@file (mode non-interaktif)")
+    parser.add_argument("-t", "--target", help="Target IP/domain/CIDR/rentang/@file untuk auto scan")
+    parser.add_argument("-e", "--engine", choices=SOCKET_ENGINES + ("nmap",), help="Engine scan (default: async)")
+    parser.add_argument("-p", "--ports", help="Daftar/rentang port (contoh: 22,80,443 atau 1-1024)")
+    parser.add_argument("--top-ports", "--top", type=int, metavar="N", help="Scan N port teratas (peringkat frekuensi)")
+    parser.add_argument("--timeout", type=float, help="Timeout awal per probe (detik)")
+    parser.add_argument("--retries", type=int, help="Jumlah retry port filtered")
+    parser.add_argument("--workers", type=int, help="Jumlah thread (engine thread)")
+    parser.add_argument("--concurrency", type=int, help="Batas koneksi bersamaan (engine async, per proses untuk shard)")
+    parser.add_argument("--processes", type=int, help="Jumlah proses worker engine shard (0 = jumlah core)")
+    parser.add_argument("-f", "--format", choices=OUTPUT_FORMATS, help="Format output non-interaktif (default: text)")
+    parser.add_argument("-o", "--output", help="Tulis hasil ke file (bukan stdout)")
+    parser.add_argument("-q", "--quiet", action="store_true", help="Tanpa info/progress di stderr")
+    parser.add_argument("--no-color", action="store_true", help="Nonaktifkan warna ANSI")
+    parser.add_argument("--no-log", action="store_true", help="Jangan simpan hasil ke riwayat")
+    parser.add_argument("--host-concurrency", type=int, help="Batas koneksi bersamaan per host")
+    parser.add_argument("--no-discovery", action="store_true", help="Lewati host discovery (scan semua host, seperti nmap -Pn)")
+    parser.add_argument("--udp", action="store_true", help="Scan UDP (payload per protokol, open/open|filtered/closed)")
+    parser.add_argument("--banners", action="store_true", help="Banner grabbing & fingerprint layanan untuk port open")
+    parser.add_argument("--rate", type=float, help="Batas probe/detik global (token bucket, 0 = tanpa batas)")
+    parser.add_argument("--host-rate", type=float, help="Batas probe/detik per host")
+    parser.add_argument("--jsonl", action="store_true", help="Sama dengan --format jsonl")
+    parser.add_argument("--all-states", action="store_true", help="Tulis juga port closed/filtered")
+    parser.add_argument("--history", type=int, nargs="?", const=40, metavar="N", help="Tampilkan N scan terakhir dari riwayat lalu keluar")
+    parser.add_argument("--history-target", help="Filter riwayat berdasarkan host")
+    parser.add_argument("--history-port", type=int, help="Filter riwayat: scan yang menemukan port ini open")
+    parser.add_argument("--since", type=parse_time_arg, help="Filter riwayat sejak tanggal (YYYY-MM-DD[THH:MM])")
+    parser.add_argument("--until", type=parse_time_arg, help="Filter riwayat sampai tanggal (YYYY-MM-DD[THH:MM])")
+    parser.add_argument("--diff", metavar="HOST", help="Bandingkan dua scan terakhir untuk HOST lalu keluar")
+    parser.add_argument("--resume", action="store_true", help="Lanjutkan scan socket terakhir yang terputus (Ctrl-C/crash)")
+    parser.add_argument("--watch", action="store_true",
+                        help="Bandingkan dengan state terakhir per host, tulis hanya port yang bertambah/hilang (exit 1 jika ada)")
+    parser.add_argument("--stale", type=parse_duration, metavar="DURASI",
+                        help="Dengan --watch: hanya probe ulang port open yang terakhir dicek lebih lama dari DURASI (15m, 2h)")
+    parser.add_argument("--full-every", type=parse_duration, metavar="DURASI",
+                        help="Dengan --stale: full sweep per host paling lama setiap DURASI (default 1d)")
     args = parser.parse_args()
+    if args.jsonl:
+        args.format = "jsonl"
+    if args.stale is not None or args.full_every is not None:
+        args.watch = True
+    spec = " ".join(args.targets + ([args.target] if args.target else []))
+    if args.top_ports and not args.ports:
+        TOP_PORT_COUNT = args.top_ports
+    batch = bool(args.format or args.output or args.ports or args.top_ports or args.targets or args.watch
+                 or (spec and not sys.stdout.isatty()))
+    if batch or args.no_color or os.environ.get("NO_COLOR") or not sys.stdout.isatty():
+        disable_colors()
+    # Override tuning diterapkan sebelum --resume agar flag yang diberikan bersama --resume tetap berlaku
+    if args.engine in SOCKET_ENGINES:
+        SCAN_ENGINE = args.engine
+    if args.timeout:
+        DEFAULT_TIMEOUT = args.timeout
+    if args.retries is not None:
+        SCAN_RETRIES = max(0, args.retries)
+    if args.workers:
+        MAX_WORKERS = args.workers
+    if args.concurrency:
+        MAX_CONCURRENCY = args.concurrency
+    if args.processes is not None:
+        SCAN_PROCESSES = max(0, args.processes)
+    if args.host_concurrency:
+        MAX_HOST_CONCURRENCY = args.host_concurrency
+    if args.udp:
+        SCAN_PROTO = "udp"
+    if args.no_discovery:
+        HOST_DISCOVERY = False
+    if args.banners:
+        GRAB_BANNERS = True
+    if args.rate is not None:
+        PROBE_RATE = max(0.0, args.rate)
+    if args.host_rate is not None:
+        HOST_PROBE_RATE = max(0.0, args.host_rate)
+    if args.history is not None:
+        show_log_tail(args.history, target=args.history_target, port=args.history_port,
+                      since=args.since, until=args.until)
+        sys.exit(0)
+    if args.diff:
+        show_scan_diff(args.diff)
+        sys.exit(0)
+    if args.resume:
+        ckpt = ScanCheckpoint.load()
+        if ckpt is None:
+            print(R + "Tidak ada checkpoint scan yang bisa dilanjutkan." + W)
+            sys.exit(1)
+        if args.engine == "nmap":
+            parser.error("--resume hanya untuk engine socket (async/thread/shard)")
+        if ckpt.engine in SOCKET_ENGINES and not args.engine:
+            SCAN_ENGINE = ckpt.engine  # --engine eksplisit diutamakan atas engine di checkpoint
+        try:
+            print_header(ckpt.target, False)
+            perform_scan(ckpt.target, False, ckpt.mode, checkpoint=ckpt)
+        except KeyboardInterrupt:
+            sys.exit(1)
+        sys.exit(0)
+    if batch:
+        # Mode non-interaktif (cron/pipeline): tanpa clear/banner/menu/warna
+        spec = spec or TARGET
+        if not spec:
+            parser.error("mode non-interaktif membutuhkan target (argumen, --target atau ERALDFORGE_TARGET)")
+        args.format = args.format or "text"
+        try:
+            targets = expand_targets(spec)
+            sys.exit(run_watch(args, targets) if args.watch else run_cli(args, targets))
+        except (ValueError, OSError) as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(2)
+        except KeyboardInterrupt:
+            sys.exit(130)
+        except BrokenPipeError:
+            # Konsumen (mis. head) menutup pipe lebih awal
+            sys.stderr.close()
+            sys.exit(0)
     try:
         # Jika 'eraldforge.py' memanggil ini, ia akan mengisi TARGET dari env var, 
         # jika tidak, ia akan meminta input.